@@ -0,0 +1,179 @@
+"""config/security.py中加解密函数的微基准
+
+输出每次调用的耗时(ns/op)以及单次调用的内存分配峰值;批量函数按列表页的常见大小测试,
+同时输出每条数据的耗时。带ref标记的为对比实现(如逐段AES),用于衡量查表等优化的效果
+
+    python -m api.bench.crypto --output before.json
+    python -m api.bench.crypto --compare before.json
+    python -m api.bench.crypto --filter phone
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from random import Random
+from timeit import Timer
+from typing import Callable
+from uuid import uuid4
+from api.config.security import (client_aes_api, generate_uuid_str, hash_api, jwt_api, jwt_cache,
+                                 phone_decrypt_many, phone_decrypy, phone_encrypt, phone_encrypt_many,
+                                 phone_tokens, server_aes_api)
+
+# 列表页的常见大小
+BATCH_SIZES = (10, 20, 100)
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], object]
+    # 单次调用处理的数据条数
+    items: int = 1
+    # 对比实现
+    ref: bool = False
+    # 耗时较长的函数(如bcrypt)减少计时次数
+    slow: bool = False
+
+
+@dataclass
+class CaseResult:
+    name: str
+    ns_per_op: float
+    ns_per_item: float
+    alloc_peak_bytes: int
+    loops: int
+    ref: bool
+
+
+def aes_phone_encrypt(plain_text: str) -> str:
+    """逐段AES加密手机号,即分段密文表之前的实现"""
+    segments = [plain_text[i:i+3] for i in range(max(len(plain_text)-3, 0)+1)]
+    return ",".join([server_aes_api.encrypt(v) for v in segments])
+
+
+def aes_phone_decrypt(encrypted_text: str) -> str:
+    """逐段AES解密手机号,即分段密文表之前的实现"""
+    phone_array = [server_aes_api.decrypt(v) for v in encrypted_text.split(",")]
+    phone = "".join([phone_array[i][0] for i in range(8)]) + phone_array[-1]
+    return f"{phone[:3]}****{phone[7:]}"
+
+
+def cases() -> list[Case]:
+    rnd = Random(0)
+    phones = [f"1{rnd.randint(3, 9)}{rnd.randint(0, 10**9 - 1):09d}" for _ in range(max(BATCH_SIZES))]
+    phone_encs = phone_encrypt_many(phones)
+    password_enc = client_aes_api.encrypt("bench_passwd")
+    password_hash = hash_api.hash("bench_passwd")
+    token = jwt_api.encode(user_uuid=generate_uuid_str(), org_uuid=generate_uuid_str(),
+                           org_owner=False, org_is_admin=False, scopes=None)
+    jwt_cache.decode(token)
+
+    items = [
+        Case("phone_encrypt", lambda: phone_encrypt(phones[0])),
+        Case("phone_encrypt[ref:aes]", lambda: aes_phone_encrypt(phones[0]), ref=True),
+        Case("phone_decrypy", lambda: phone_decrypy(phone_encs[0])),
+        Case("phone_decrypy[ref:aes]", lambda: aes_phone_decrypt(phone_encs[0]), ref=True),
+        Case("phone_tokens", lambda: phone_tokens(phones[0])),
+        Case("client_aes_api.decrypt", lambda: client_aes_api.decrypt(password_enc)),
+        Case("jwt_api.encode", lambda: jwt_api.encode(user_uuid="u", org_uuid="o", org_owner=False,
+                                                      org_is_admin=False, scopes=None)),
+        Case("jwt_api.decode", lambda: jwt_api.decode(token)),
+        Case("jwt_cache.decode", lambda: jwt_cache.decode(token)),
+        Case("generate_uuid_str", generate_uuid_str),
+        Case("generate_uuid_str[ref:uuid4().hex]", lambda: uuid4().hex, ref=True),
+        Case("hash_api.hash", lambda: hash_api.hash("bench_passwd"), slow=True),
+        Case("hash_api.verify", lambda: hash_api.verify("bench_passwd", password_hash), slow=True),
+    ]
+
+    for size in BATCH_SIZES:
+        batch, batch_encs = phones[:size], phone_encs[:size]
+        items += [
+            Case(f"phone_encrypt_many[{size}]", lambda b=batch: phone_encrypt_many(b), items=size),
+            Case(f"phone_encrypt[ref:aes][{size}]", lambda b=batch: [aes_phone_encrypt(v) for v in b],
+                 items=size, ref=True),
+            Case(f"phone_decrypt_many[{size}]", lambda b=batch_encs: phone_decrypt_many(b), items=size),
+            Case(f"phone_decrypy[ref:aes][{size}]", lambda b=batch_encs: [aes_phone_decrypt(v) for v in b],
+                 items=size, ref=True),
+        ]
+    return items
+
+
+def measure(case: Case, repeat: int, min_seconds: float) -> CaseResult:
+    """取多次计时中的最小值作为单次耗时;内存分配峰值通过tracemalloc单独统计"""
+    timer = Timer(case.func)
+    if case.slow:
+        loops = 1
+    else:
+        loops, elapsed = timer.autorange()
+        if elapsed < min_seconds:
+            loops = max(int(loops * min_seconds / max(elapsed, 1e-9)), 1)
+
+    best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+    ns = best * 1e9
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        case.func()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    return CaseResult(name=case.name, ns_per_op=round(ns, 1), ns_per_item=round(ns / case.items, 1),
+                      alloc_peak_bytes=peak, loops=loops, ref=case.ref)
+
+
+def compare(results: list[CaseResult], baseline: dict, threshold: float) -> list[str]:
+    """与基线对比ns/op,返回变慢超过阈值的用例"""
+    base = {item["name"]: item for item in baseline["results"]}
+    slower = []
+    print(f"{'case':<40}{'base ns/op':>14}{'ns/op':>14}{'change':>10}", file=sys.stderr)
+    for result in results:
+        if (item := base.get(result.name)) is None:
+            continue
+        change = result.ns_per_op / item["ns_per_op"] - 1
+        print(f"{result.name:<40}{item['ns_per_op']:>14.1f}{result.ns_per_op:>14.1f}{change:>+10.1%}",
+              file=sys.stderr)
+        if change > threshold and not result.ref:
+            slower.append(result.name)
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="加解密函数的微基准")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="每次计时的最短时间")
+    parser.add_argument("--no-slow", action="store_true", help="跳过bcrypt等耗时用例")
+    parser.add_argument("--output", help="JSON结果输出文件")
+    parser.add_argument("--compare", help="基线结果文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许变慢的比例,超出时返回非0")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<40}{'ns/op':>14}{'ns/item':>12}{'alloc peak B':>14}", file=sys.stderr)
+    for case in cases():
+        if args.filter not in case.name or (args.no_slow and case.slow):
+            continue
+        result = measure(case, args.repeat, args.min_seconds)
+        results.append(result)
+        print(f"{result.name:<40}{result.ns_per_op:>14.1f}{result.ns_per_item:>12.1f}{result.alloc_peak_bytes:>14}",
+              file=sys.stderr)
+
+    output = dict(results=[asdict(result) for result in results])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            slower = compare(results, json.load(f), args.threshold)
+        if slower:
+            print(f"变慢: {', '.join(slower)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
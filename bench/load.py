@@ -0,0 +1,247 @@
+"""接口压测
+
+写入压测数据后,在进程内(httpx ASGITransport)或本地uvicorn中运行应用,
+按场景并发请求热点接口,输出吞吐量以及p50/p95/p99延迟;结果可保存为JSON并与基线对比
+
+    python -m api.bench.load --users 20000 --orgs 2000 --requests 500 --concurrency 16 --output head.json
+    python -m api.bench.load --uvicorn --workers 4 --baseline head.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime
+from statistics import mean
+from time import perf_counter
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list[float], p: float) -> float:
+    """最近秩百分位数,values需已排序"""
+    if not values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """单个场景的统计结果,延迟单位为毫秒"""
+    values = sorted(v * 1000 for v in latencies)
+    return dict(requests=len(values),
+                errors=errors,
+                seconds=round(elapsed, 3),
+                rps=round(len(values) / elapsed, 2) if elapsed else 0,
+                mean_ms=round(mean(values), 3) if values else 0,
+                p50_ms=round(percentile(values, 50), 3),
+                p95_ms=round(percentile(values, 95), 3),
+                p99_ms=round(percentile(values, 99), 3),
+                max_ms=round(values[-1], 3) if values else 0)
+
+
+def scenarios(info, password_enc: str) -> dict[str, tuple[str, str, dict]]:
+    """压测场景: 名称 -> (方法, 路径, 请求参数)"""
+    return {
+        "auth_password": ("POST", "/auth/password",
+                          dict(json={"account": info.admin_account, "password_enc": password_enc})),
+        "account_list": ("GET", "/account/list", dict(params={"page_size": 20})),
+        "account_list_deep": ("GET", "/account/list", dict(params={"page_size": 20, "page_idx": 200})),
+        "account_list_phone": ("GET", "/account/list", dict(params={"phone": info.sample_phone[3:8]})),
+        "account_list_name": ("GET", "/account/list", dict(params={"nick_name": "用户12"})),
+        "org_list": ("GET", "/org/list", dict(params={"page_size": 20})),
+        "role_list": ("GET", "/role/list", dict(params={"page_size": 20})),
+    }
+
+
+async def run_scenario(client, method: str, path: str, kwargs: dict, headers: dict,
+                       requests: int, concurrency: int, warmup: int) -> dict:
+    """并发执行同一请求;业务代码不为0或HTTP状态不为200计为错误"""
+    for _ in range(warmup):
+        await client.request(method, path, headers=headers, **kwargs)
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = perf_counter()
+            rsp = await client.request(method, path, headers=headers, **kwargs)
+            latencies.append(perf_counter() - start)
+            if rsp.status_code != 200 or rsp.json().get("code") != 0:
+                errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, errors, perf_counter() - start)
+
+
+async def run_all(client, info, selected: list[str], requests: int, concurrency: int, warmup: int) -> dict:
+    from api.config.security import client_aes_api
+
+    password_enc = client_aes_api.encrypt(info.admin_password)
+    rsp = await client.post("/auth/password",
+                            json={"account": info.admin_account, "password_enc": password_enc})
+    headers = {"Authorization": f"Bearer {rsp.json()['data']['jwt']}"}
+
+    result = {}
+    for name, (method, path, kwargs) in scenarios(info, password_enc).items():
+        if selected and name not in selected:
+            continue
+        result[name] = await run_scenario(client, method, path, kwargs, headers,
+                                          requests, concurrency, warmup)
+        print(f"{name:<20} {json.dumps(result[name])}", file=sys.stderr)
+    return result
+
+
+async def run_in_process(info, selected: list[str], requests: int, concurrency: int, warmup: int) -> dict:
+    import httpx
+    from api.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_all(client, info, selected, requests, concurrency, warmup)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(info, selected: list[str], requests: int, concurrency: int, warmup: int,
+                      workers: int) -> dict:
+    """启动本地uvicorn,数据库连接等配置通过环境变量传递"""
+    import httpx
+
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "api.main:app",
+                                "--app-dir", os.path.dirname(PACKAGE_DIR),
+                                "--port", str(port), "--workers", str(workers),
+                                "--log-level", "warning"],
+                               env=os.environ.copy())
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/docs")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn启动失败")
+            return await run_all(client, info, selected, requests, concurrency, warmup)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> list[str]:
+    """与基线对比p95以及吞吐量,返回超出允许退化比例的场景"""
+    regressions = []
+    for name, stats in result["scenarios"].items():
+        if (base := baseline.get("scenarios", {}).get(name)) is None:
+            continue
+        p95 = stats["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0
+        rps = 1 - stats["rps"] / base["rps"] if base["rps"] else 0
+        print(f"{name:<20} p95 {base['p95_ms']:>9.3f} -> {stats['p95_ms']:>9.3f}ms ({p95:+.1%})  "
+              f"rps {base['rps']:>9.2f} -> {stats['rps']:>9.2f} ({-rps:+.1%})", file=sys.stderr)
+        if p95 > max_regression or rps > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="接口压测")
+    parser.add_argument("--url", help="空库的数据库连接,默认使用临时SQLite文件")
+    # 数据量,默认值见SeedVolume
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orgs", type=int)
+    parser.add_argument("--memberships", type=int)
+    parser.add_argument("--roles", type=int)
+    parser.add_argument("--apps", type=int)
+    parser.add_argument("--services", type=int)
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scenario", action="append", default=[], help="只运行指定场景,可重复")
+    parser.add_argument("--uvicorn", action="store_true", help="在本地uvicorn中运行应用,默认在进程内运行")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn的worker数")
+    parser.add_argument("--output", help="JSON结果输出文件")
+    parser.add_argument("--baseline", help="基线结果文件,用于对比")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="允许的p95以及吞吐量退化比例,超出时返回非0")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'load.db')}"
+
+        # 应用配置在导入时读取,需在导入api模块前设置
+        os.environ["DB_RDS"] = url
+        os.environ.setdefault("DB_ASYNC", "false")
+
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        from .query_plans import upgrade
+        from .seed import SeedVolume, seed
+
+        volume = SeedVolume(**{k: v for k, v in vars(args).items()
+                               if k in SeedVolume.__dataclass_fields__ and v is not None})
+
+        engine = create_engine(url)
+        upgrade(engine, "head")
+        with Session(engine) as session:
+            info = seed(session, volume)
+        engine.dispose()
+
+        if args.uvicorn:
+            scenarios_result = asyncio.run(run_uvicorn(info, args.scenario, args.requests, args.concurrency,
+                                                       args.warmup, args.workers))
+        else:
+            scenarios_result = asyncio.run(run_in_process(info, args.scenario, args.requests,
+                                                          args.concurrency, args.warmup))
+
+    result = dict(meta=dict(commit=git_commit(),
+                            timestamp=datetime.now().isoformat(timespec="seconds"),
+                            python=platform.python_version(),
+                            database=url.split(":", 1)[0],
+                            mode=f"uvicorn x{args.workers}" if args.uvicorn else "in-process",
+                            requests=args.requests,
+                            concurrency=args.concurrency,
+                            volume=asdict(volume)),
+                  scenarios=scenarios_result)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            print(f"性能退化: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""热点查询的执行计划对比
+
+在迁移0002(未建索引)的库中写入压测数据,捕获各热点查询实际执行的SQL,
+输出EXPLAIN结果以及平均耗时;然后升级到最新版本(0003热点索引)再次输出,用于对比
+
+    python -m api.bench.query_plans --users 20000 --orgs 2000
+    python -m api.bench.query_plans --url mysql+pymysql://... --output plans.json
+"""
+import argparse
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.orm import Session
+from api.model.user import UserAuthType
+from api.schema.auth import AuthAPI
+from api.schema.base import Actor, Pagination
+from api.schema.org import OrgAPI
+from api.schema.orm import count_cache
+from api.schema.permission import PermissionIndex
+from api.schema.refdata import RefDataCache
+from api.schema.user import UserAPI, check_account_unique, check_org_owner, check_superadmin
+from api.config.security import phone_encrypt
+from .seed import SeedInfo, SeedVolume, seed
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+# 未建热点索引的版本
+BASELINE_REVISION = "0002"
+
+
+def hot_queries(info: SeedInfo) -> dict[str, Callable[[Session], object]]:
+    """热点查询,与接口中的调用方式保持一致"""
+    def actor(session: Session) -> Actor:
+        return Actor(session=session, user_uuid=info.admin_uuid, org_uuid=info.admin_org_uuid,
+                     is_org_owner=True, is_org_admin=True)
+
+    first_page = Pagination(page_idx=1, page_size=20)
+    deep_page = Pagination(page_idx=200, page_size=20)
+
+    return {
+        "login_info": lambda s: AuthAPI.get_login_info(s, info.admin_account, UserAuthType.PASSWORD),
+        "user_org_list": lambda s: AuthAPI.get_user_org_list(s, info.sample_user_uuid),
+        "check_superadmin": lambda s: check_superadmin(s, info.sample_user_uuid),
+        "check_org_owner": lambda s: check_org_owner(s, info.sample_user_uuid),
+        "check_account_unique": lambda s: check_account_unique(s, phone_encrypt(info.sample_phone), "bench_new_account"),
+        "account_list": lambda s: UserAPI.get_account_list(actor(s), first_page),
+        "account_list_deep": lambda s: UserAPI.get_account_list(actor(s), deep_page),
+        "account_list_phone": lambda s: UserAPI.get_account_list(actor(s), first_page, phone=info.sample_phone[3:8]),
+        "account_orgs": lambda s: UserAPI.get_account_orgs(actor(s), first_page, info.sample_user_uuid),
+        "org_list": lambda s: OrgAPI.get_org_list(actor(s), first_page),
+        # 角色以及应用服务列表在参考数据快照中查询,仅加载快照时访问数据库
+        "refdata_load": lambda s: RefDataCache(ttl=0).load(s),
+        "permission_index": lambda s: PermissionIndex(ttl=0).load(s, info.sample_org_uuid),
+    }
+
+
+@contextmanager
+def capture(engine: Engine):
+    """捕获执行的SQL以及参数"""
+    statements: list[tuple[str, object]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain_prefix(engine: Engine) -> str:
+    match engine.dialect.name:
+        case "sqlite":
+            return "EXPLAIN QUERY PLAN "
+        case _:
+            return "EXPLAIN "
+
+
+def explain(engine: Engine, queries: dict[str, Callable[[Session], object]], repeat: int) -> dict:
+    """执行每个热点查询,返回其SQL的执行计划以及平均耗时(毫秒)"""
+    prefix = explain_prefix(engine)
+    result = {}
+
+    for name, query in queries.items():
+        # 总数缓存会跳过count查询,每次都清空以捕获完整的SQL
+        count_cache.clear()
+        with Session(engine) as session, capture(engine) as statements:
+            query(session)
+
+        plans = []
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+
+                start = perf_counter()
+                for _ in range(repeat):
+                    conn.exec_driver_sql(statement, parameters).fetchall()
+                elapsed = (perf_counter() - start) * 1000 / repeat
+
+                plans.append(dict(sql=" ".join(statement.split()),
+                                  plan=[" | ".join(str(v) for v in row) for row in rows],
+                                  avg_ms=round(elapsed, 3)))
+
+        result[name] = plans
+    return result
+
+
+def upgrade(engine: Engine, revision: str) -> None:
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, revision)
+
+
+def run(url: str, volume: SeedVolume, repeat: int) -> dict:
+    engine = create_engine(url)
+
+    upgrade(engine, BASELINE_REVISION)
+    with Session(engine) as session:
+        info = seed(session, volume)
+
+    queries = hot_queries(info)
+    before = explain(engine, queries, repeat)
+
+    upgrade(engine, "head")
+    if engine.dialect.name in ("sqlite", "postgresql"):
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    after = explain(engine, queries, repeat)
+
+    engine.dispose()
+    return {name: dict(before=before[name], after=after[name]) for name in queries}
+
+
+def report(result: dict) -> str:
+    """按查询输出对比文本"""
+    lines = []
+    for name, plans in result.items():
+        before_ms = sum(p["avg_ms"] for p in plans["before"])
+        after_ms = sum(p["avg_ms"] for p in plans["after"])
+        lines.append(f"== {name}: {before_ms:.3f}ms -> {after_ms:.3f}ms")
+        for before, after in zip(plans["before"], plans["after"]):
+            lines.append(f"   SQL: {before['sql'][:160]}")
+            lines.extend(f"   - {row}" for row in before["plan"])
+            lines.extend(f"   + {row}" for row in after["plan"])
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="热点查询的执行计划对比")
+    parser.add_argument("--url", help="空库的数据库连接,默认使用临时SQLite文件")
+    parser.add_argument("--users", type=int, default=SeedVolume.users)
+    parser.add_argument("--orgs", type=int, default=SeedVolume.orgs)
+    parser.add_argument("--repeat", type=int, default=20, help="每条SQL的计时次数")
+    parser.add_argument("--output", help="JSON结果输出文件")
+    args = parser.parse_args()
+
+    volume = SeedVolume(users=args.users, orgs=args.orgs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'query_plans.db')}"
+        result = run(url, volume, args.repeat)
+
+    print(report(result))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Rsp响应序列化的CPU耗时
+
+对比同一个分页结果(默认100行,字段与/account/list一致)在不同响应路径下每个请求消耗的CPU时间:
+
+- asgi[...]: 直接调用ASGI应用的完整请求,包含路由、依赖以及序列化;
+  before:annotated为返回值注解Rsp的接口(FastAPI校验后由pydantic序列化),
+  before:plain为无注解的接口(jsonable_encoder + json.dumps),after为RspRoute
+- encode[...]: 仅序列化Rsp
+
+    python -m api.bench.response
+    python -m api.bench.response --rows 20 --rows 100 --output response.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from time import process_time_ns
+from typing import Callable
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from jhu.orm import format_filed
+from api.config import fastjson
+from api.service.base import Rsp, RspRoute, rsp_json
+
+
+@dataclass
+class CaseResult:
+    name: str
+    rows: int
+    cpu_us_per_op: float
+    body_bytes: int
+
+
+def page(rows: int) -> dict:
+    """与UserAPI.get_account_list返回结构一致的分页结果"""
+    start = datetime(2026, 1, 1)
+    records = [format_filed(dict(user_uuid=f"{i:032x}",
+                                 account=f"user{i:06d}",
+                                 nick_name=f"用户{i}",
+                                 phone=f"139****{i % 10000:04d}",
+                                 user_status=i % 2,
+                                 created_at=start + timedelta(minutes=i),
+                                 updated_at=start + timedelta(minutes=i, seconds=30)))
+               for i in range(rows)]
+    return dict(records=records,
+                pagination=dict(page_idx=1, page_size=rows, page_total=100, total=rows * 100))
+
+
+def bench_app(data: dict) -> FastAPI:
+    before = APIRouter()
+    after = APIRouter(route_class=RspRoute)
+
+    @before.get("/before/annotated")
+    async def before_annotated() -> Rsp:
+        return Rsp(data=data)
+
+    @before.get("/before/plain")
+    async def before_plain():
+        return Rsp(data=data)
+
+    @after.get("/after")
+    async def after_route() -> Rsp:
+        return Rsp(data=data)
+
+    app = FastAPI()
+    app.include_router(before)
+    app.include_router(after)
+    return app
+
+
+async def asgi_get(app: FastAPI, path: str) -> bytes:
+    """不经过网络直接调用ASGI应用"""
+    scope = dict(type="http", asgi={"version": "3.0"}, http_version="1.1", method="GET", scheme="http",
+                 path=path, raw_path=path.encode(), root_path="", query_string=b"", headers=[],
+                 client=("127.0.0.1", 1), server=("bench", 80))
+    body = []
+
+    async def receive():
+        return dict(type="http.request", body=b"", more_body=False)
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+def measure(func: Callable[[], bytes], min_ns: int, repeat: int) -> tuple[float, int]:
+    """取多次计时中的最小值,返回每次调用的CPU时间(微秒)以及输出大小"""
+    body = func()
+    loops = 1
+    while True:
+        start = process_time_ns()
+        for _ in range(loops):
+            func()
+        elapsed = process_time_ns() - start
+        if elapsed >= min_ns:
+            break
+        loops *= 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = process_time_ns()
+        for _ in range(loops):
+            func()
+        best = min(best, process_time_ns() - start)
+    return best / loops / 1000, len(body)
+
+
+def cases(rows: int, loop: asyncio.AbstractEventLoop) -> dict[str, Callable[[], bytes]]:
+    data = page(rows)
+    app = bench_app(data)
+
+    def stdlib_json(rsp: Rsp) -> bytes:
+        orjson, fastjson.orjson = fastjson.orjson, None
+        try:
+            return rsp_json(rsp)
+        finally:
+            fastjson.orjson = orjson
+
+    return {
+        "asgi[before:annotated]": lambda: loop.run_until_complete(asgi_get(app, "/before/annotated")),
+        "asgi[before:plain]": lambda: loop.run_until_complete(asgi_get(app, "/before/plain")),
+        "asgi[after]": lambda: loop.run_until_complete(asgi_get(app, "/after")),
+        "encode[jsonable_encoder]": lambda: json.dumps(jsonable_encoder(Rsp(data=data)), ensure_ascii=False,
+                                                       separators=(",", ":")).encode(),
+        "encode[model_dump_json]": lambda: Rsp(data=data).model_dump_json().encode(),
+        "encode[rsp_json]": lambda: rsp_json(Rsp(data=data)),
+        "encode[rsp_json:stdlib]": lambda: stdlib_json(Rsp(data=data)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rsp响应序列化的CPU耗时")
+    parser.add_argument("--rows", type=int, action="append", help="每页行数,可重复,默认100")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-ms", type=float, default=200, help="每次计时的最短CPU时间(毫秒)")
+    parser.add_argument("--output", help="JSON结果输出文件")
+    args = parser.parse_args()
+
+    if fastjson.orjson is None:
+        print("未安装orjson,rsp_json使用标准库json", file=sys.stderr)
+
+    loop = asyncio.new_event_loop()
+    results = []
+    print(f"{'case':<28}{'rows':>6}{'cpu us/op':>12}{'bytes':>10}", file=sys.stderr)
+    for rows in args.rows or [100]:
+        for name, func in cases(rows, loop).items():
+            cpu_us, size = measure(func, int(args.min_ms * 1e6), args.repeat)
+            results.append(CaseResult(name=name, rows=rows, cpu_us_per_op=round(cpu_us, 1), body_bytes=size))
+            print(f"{name:<28}{rows:>6}{cpu_us:>12.1f}{size:>10}", file=sys.stderr)
+    loop.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(dict(results=[asdict(result) for result in results]), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from random import Random
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from api.config.security import hash_api, phone_encrypt_many, phone_tokens
+from api.model.app import App, AppService, AppRole
+from api.model.org import Org, OrgUser, OrgUserRole
+from api.model.role import Role
+from api.model.user import User, UserAuth, UserPhoneToken
+
+
+@dataclass
+class SeedVolume:
+    """压测数据量"""
+    users: int = 10000
+    orgs: int = 1000
+    # 每个用户加入的组织数
+    memberships: int = 3
+    roles: int = 20
+    apps: int = 5
+    # 每个应用的服务数
+    services: int = 20
+    # 随机数种子,保证每次生成的数据一致
+    seed: int = 0
+
+
+@dataclass
+class SeedInfo:
+    """压测数据中的样例信息,供查询以及登录使用"""
+    admin_account: str
+    admin_password: str
+    admin_uuid: str
+    admin_org_uuid: str
+    sample_user_uuid: str
+    sample_org_uuid: str
+    sample_phone: str
+    sample_app_id: int
+
+
+def _chunks(rows: list, size: int = 5000):
+    for i in range(0, len(rows), size):
+        yield rows[i:i+size]
+
+
+def _bulk_insert(session: Session, model, rows: list[dict]) -> None:
+    for chunk in _chunks(rows):
+        session.execute(insert(model), chunk)
+
+
+def seed(session: Session, volume: SeedVolume = SeedVolume(), password: str = "bench_passwd") -> SeedInfo:
+    """按数据量写入压测数据;用户0为平台组织(组织0)的所有者,且只属于平台组织"""
+    rnd = Random(volume.seed)
+    now = datetime.now().replace(microsecond=0)
+
+    def created(i: int) -> dict:
+        at = now - timedelta(seconds=i)
+        return dict(created_at=at, updated_at=at)
+
+    # 用户以及认证信息,所有用户使用同一个密码
+    user_uuids = [f"{i:032x}" for i in range(volume.users)]
+    phones = [f"1{rnd.randint(3, 9)}{rnd.randint(0, 10**9 - 1):09d}" for _ in range(volume.users)]
+    auth_value = hash_api.hash(password)
+
+    _bulk_insert(session, User, [
+        dict(user_uuid=uuid, account="admin" if i == 0 else f"user{i}", nick_name=f"用户{i}",
+             phone_enc=phone_enc, avatar_url="", user_status=1, is_deleted=False, **created(i))
+        for i, (uuid, phone_enc) in enumerate(zip(user_uuids, phone_encrypt_many(phones)))
+    ])
+    _bulk_insert(session, UserAuth, [
+        dict(user_uuid=uuid, auth_type=0, auth_identify="", auth_value=auth_value, **created(i))
+        for i, uuid in enumerate(user_uuids)
+    ])
+    _bulk_insert(session, UserPhoneToken, [
+        dict(token_hash=token, user_uuid=uuid, **created(i))
+        for i, (uuid, phone) in enumerate(zip(user_uuids, phones)) for token in phone_tokens(phone)
+    ])
+
+    # 组织以及组织用户
+    org_uuids = [f"{i:032x}" for i in range(volume.orgs)]
+    # 用户0只属于平台组织,登录后直接进入平台组织
+    owners = [user_uuids[0]] + [rnd.choice(user_uuids[1:]) for _ in range(volume.orgs - 1)]
+    _bulk_insert(session, Org, [
+        dict(org_uuid=uuid, org_name=f"组织{i}", owner_uuid=owner, org_remark="", org_status=1,
+             is_admin=i == 0, is_deleted=False, **created(i))
+        for i, (uuid, owner) in enumerate(zip(org_uuids, owners))
+    ])
+
+    members = {(org, owner) for org, owner in zip(org_uuids, owners)}
+    for uuid in user_uuids[1:]:
+        for org in rnd.sample(org_uuids[1:], min(volume.memberships, volume.orgs - 1)):
+            members.add((org, uuid))
+    members = sorted(members)
+
+    _bulk_insert(session, OrgUser, [
+        dict(org_uuid=org, user_uuid=uuid, org_user_name="", org_user_avatar_url="",
+             org_user_status=1, **created(i))
+        for i, (org, uuid) in enumerate(members)
+    ])
+
+    # 默认角色,应用服务以及授权
+    _bulk_insert(session, Role, [
+        dict(id=i + 1, role_name=f"角色{i}", org_uuid="", role_remark="", role_status=1,
+             is_deleted=False, **created(i))
+        for i in range(volume.roles)
+    ])
+    _bulk_insert(session, App, [
+        dict(id=i + 1, app_name=f"应用{i}", app_remark="", app_status=1, is_deleted=False, **created(i))
+        for i in range(volume.apps)
+    ])
+    service_ids = list(range(1, volume.apps * volume.services + 1))
+    _bulk_insert(session, AppService, [
+        dict(id=sid, app_id=(sid - 1) // volume.services + 1, service_name=f"服务{sid}",
+             service_tag=f"svc:{sid}", **created(sid))
+        for sid in service_ids
+    ])
+    _bulk_insert(session, AppRole, [
+        dict(app_id=(sid - 1) // volume.services + 1, role_id=role_id, org_uuid="", app_service_id=sid,
+             data_scope_dept=0, data_scope_region=0, **created(sid))
+        for role_id in range(1, volume.roles + 1)
+        for sid in rnd.sample(service_ids, min(10, len(service_ids)))
+    ])
+    _bulk_insert(session, OrgUserRole, [
+        dict(org_uuid=org, user_uuid=uuid, role_id=rnd.randint(1, volume.roles), **created(i))
+        for i, (org, uuid) in enumerate(members)
+    ])
+
+    session.commit()
+
+    return SeedInfo(admin_account="admin",
+                    admin_password=password,
+                    admin_uuid=user_uuids[0],
+                    admin_org_uuid=org_uuids[0],
+                    sample_user_uuid=user_uuids[len(user_uuids) // 2],
+                    sample_org_uuid=org_uuids[len(org_uuids) // 2],
+                    sample_phone=phones[len(phones) // 2],
+                    sample_app_id=1)
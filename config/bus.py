@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from typing import AsyncIterator, Callable
+from uuid import uuid4
+
+logger = logging.getLogger("api.bus")
+
+
+class MemoryBroker:
+    """进程内的消息代理,用于单worker部署以及测试;多个InvalidationBus共享同一实例时可模拟多个worker"""
+
+    def __init__(self) -> None:
+        self._queues: list[asyncio.Queue] = []
+
+    async def publish(self, message: str) -> None:
+        for queue in self._queues:
+            queue.put_nowait(message)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        queue = asyncio.Queue()
+        self._queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBroker:
+    """基于Redis Pub/Sub的消息代理,用于多worker以及多实例部署(依赖redis)"""
+
+    def __init__(self, url: str, channel: str) -> None:
+        from redis.asyncio import from_url
+
+        self.channel = channel
+        self._client = from_url(url)
+
+    async def publish(self, message: str) -> None:
+        await self._client.publish(self.channel, message)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for item in pubsub.listen():
+                if item["type"] == "message":
+                    yield item["data"].decode() if isinstance(item["data"], bytes) else item["data"]
+        finally:
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def new_broker(url: str, channel: str) -> MemoryBroker | RedisBroker | None:
+    """根据连接串创建消息代理: 空字符串表示不跨worker广播,memory://为进程内代理,redis://为Redis"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url, channel)
+    raise ValueError(f"不支持的消息代理: {url}")
+
+
+class InvalidationBus:
+    """缓存失效广播
+
+    publish先在本worker内同步执行失效,再通过消息代理广播给其他worker;
+    收到其他worker的消息时执行同样的失效。消息代理不可用时仅影响其他worker,由缓存有效期兜底
+
+    publish可在线程池以及事件循环中调用,广播在start所在的事件循环中异步完成
+
+    Args:
+        broker: 消息代理,None表示只在本worker内失效
+    """
+
+    def __init__(self, broker: MemoryBroker | RedisBroker | None = None) -> None:
+        self.broker = broker
+        self.origin = uuid4().hex
+        self._handlers: dict[str, list[Callable]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._outbox: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+
+    def subscribe(self, topic: str, handler: Callable) -> None:
+        """注册失效处理函数,参数为publish时传入的参数,需可JSON序列化"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, *args) -> None:
+        self._dispatch(topic, args)
+        self.published += 1
+
+        if self._loop is None or self._loop.is_closed():
+            return
+        message = json.dumps(dict(origin=self.origin, topic=topic, args=args))
+        self._loop.call_soon_threadsafe(self._outbox.put_nowait, message)
+
+    def _dispatch(self, topic: str, args) -> None:
+        for handler in self._handlers.get(topic, []):
+            try:
+                handler(*args)
+            except Exception:
+                self.errors += 1
+                logger.exception("缓存失效处理失败: %s%s", topic, args)
+
+    async def start(self) -> None:
+        """开始广播以及接收消息,在应用启动时调用"""
+        if self.broker is None or self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._outbox = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._send()), asyncio.create_task(self._receive())]
+        # 等待订阅建立,避免启动后立即发布的消息丢失
+        await asyncio.sleep(0)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._loop = None
+        if self.broker is not None:
+            await self.broker.close()
+
+    async def _send(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self.broker.publish(message)
+            except Exception:
+                self.errors += 1
+                logger.exception("缓存失效广播失败")
+
+    async def _receive(self) -> None:
+        while True:
+            try:
+                async for message in self.broker.subscribe():
+                    item = json.loads(message)
+                    if item["origin"] == self.origin:
+                        continue
+                    self.received += 1
+                    self._dispatch(item["topic"], item["args"])
+            except Exception:
+                self.errors += 1
+                logger.exception("缓存失效消息接收失败,稍后重试")
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict:
+        return dict(broker=type(self.broker).__name__ if self.broker is not None else None,
+                    running=bool(self._tasks),
+                    topics=sorted(self._handlers),
+                    published=self.published,
+                    received=self.received,
+                    errors=self.errors)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """线程安全的LRU缓存,支持按条目设置过期时间
+
+    Args:
+        max_size: 最大条目数,超出时淘汰最久未使用的条目
+        ttl: 默认有效期(秒),None表示不过期
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存,过期条目视为未命中"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expire_at = item
+                if expire_at is None or expire_at > time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, expire_at: float | None = None) -> None:
+        """写入缓存
+
+        Args:
+            ttl: 本条目的有效期(秒),默认使用缓存的ttl
+            expire_at: 本条目的过期时间戳,与ttl同时设置时取较早者
+        """
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        deadlines = [t for t in (expire_at, None if ttl is None else time() + ttl) if t is not None]
+
+        with self._lock:
+            self._data[key] = (value, min(deadlines) if deadlines else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除缓存条目"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def pop_if(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除key满足条件的所有条目,返回删除数量"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """缓存命中信息"""
+        lookups = self.hits + self.misses
+        return dict(size=len(self._data),
+                    max_size=self.max_size,
+                    hits=self.hits,
+                    misses=self.misses,
+                    hit_rate=round(self.hits / lookups, 4) if lookups else 0,
+                    evictions=self.evictions,
+                    expirations=self.expirations
+                    )
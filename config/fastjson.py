@@ -0,0 +1,42 @@
+import json
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+from pydantic import BaseModel
+
+# 可选依赖:未安装orjson时使用标准库json,输出内容一致
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(value: Any) -> Any:
+    """orjson以及json无法直接序列化的类型,与pydantic的JSON输出保持一致"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """序列化为UTF-8编码的紧凑JSON"""
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(",", ":")).encode()
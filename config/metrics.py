@@ -0,0 +1,190 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable
+
+
+class Metric:
+    """指标基类;按标签值分别保存数据,标签值为与labelnames对应的元组
+
+    Args:
+        name: 指标名称,如db_pool_checkout_seconds
+        help: 指标说明
+        labelnames: 标签名称
+    """
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> dict[tuple, object]:
+        """当前的全部数据,key为标签值"""
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """计数器,只增不减"""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """当前值;可以直接设置,也可以通过回调函数在读取时计算"""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 function: Callable[[], dict[tuple, float]] | None = None) -> None:
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> dict[tuple, object]:
+        if self.function is not None:
+            return dict(self.function())
+        return super().samples()
+
+
+class HistogramValue:
+    """直方图数据:各桶的计数(非累计)以及总和"""
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    """直方图,记录分布;buckets为各桶的上限,最后自动追加+Inf"""
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            if (item := self._values.get(key)) is None:
+                item = self._values[key] = HistogramValue(len(self.buckets))
+            item.buckets[idx] += 1
+            item.count += 1
+            item.sum += value
+
+
+class MetricsRegistry:
+    """进程内的指标注册表;多worker部署时每个进程分别统计"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+              function: Callable[[], dict[tuple, float]] | None = None) -> Gauge:
+        return self._register(Gauge(name, help, labelnames, function))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collect(self) -> list[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """以Prometheus文本格式输出全部指标"""
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+
+            for key, value in metric.samples().items():
+                labels = list(zip(metric.labelnames, key))
+                if isinstance(value, HistogramValue):
+                    cumulative = 0
+                    for le, n in zip(metric.buckets, value.buckets):
+                        cumulative += n
+                        lines.append(f"{metric.name}_bucket{_labels(labels + [('le', _format_le(le))])} {cumulative}")
+                    lines.append(f"{metric.name}_sum{_labels(labels)} {value.sum}")
+                    lines.append(f"{metric.name}_count{_labels(labels)} {value.count}")
+                else:
+                    lines.append(f"{metric.name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """以字典形式输出指标,用于内部接口;直方图输出累计桶计数"""
+        data = {}
+        for metric in self.collect():
+            if not metric.name.startswith(prefix):
+                continue
+
+            series = []
+            for key, value in metric.samples().items():
+                labels = dict(zip(metric.labelnames, key))
+                if isinstance(value, HistogramValue):
+                    cumulative, buckets = 0, {}
+                    for le, n in zip(metric.buckets, value.buckets):
+                        cumulative += n
+                        buckets[str(le)] = cumulative
+                    series.append(dict(labels=labels, count=value.count,
+                                       sum=round(value.sum, 6), buckets=buckets))
+                else:
+                    series.append(dict(labels=labels, value=value))
+
+            data[metric.name] = dict(type=metric.type, help=metric.help, series=series)
+        return data
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(labels: list[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_le(le: float) -> str:
+    return "+Inf" if le == float("inf") else repr(float(le))
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,98 @@
+from time import perf_counter
+from typing import Any
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .metrics import metrics
+
+
+pool_checkout_seconds = metrics.histogram("db_pool_checkout_seconds",
+                                          "从连接池获取连接的等待时间(秒)", ("pool",),
+                                          buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                                                   0.1, 0.5, 1, 5, 10, 30))
+pool_timeouts = metrics.counter("db_pool_timeouts_total",
+                                "获取连接超时的次数", ("pool",))
+pool_connects = metrics.counter("db_pool_connects_total",
+                                "新建数据库连接的次数", ("pool",))
+pool_invalidations = metrics.counter("db_pool_invalidations_total",
+                                     "连接失效的次数;soft为true表示连接归还时才关闭", ("pool", "soft"))
+
+# 已注册的引擎,用于读取连接池的实时状态
+_engines: dict[str, Any] = {}
+
+
+def _pool_status(method: str) -> dict[tuple, float]:
+    return {(name,): getattr(engine.pool, method)() for name, engine in _engines.items()
+            if isinstance(engine.pool, QueuePool)}
+
+
+pool_size = metrics.gauge("db_pool_size", "连接池的常驻连接数", ("pool",),
+                          function=lambda: _pool_status("size"))
+pool_checked_out = metrics.gauge("db_pool_checked_out", "正在使用的连接数", ("pool",),
+                                 function=lambda: _pool_status("checkedout"))
+pool_checked_in = metrics.gauge("db_pool_checked_in", "池中空闲的连接数", ("pool",),
+                                function=lambda: _pool_status("checkedin"))
+pool_overflow = metrics.gauge("db_pool_overflow", "超出常驻连接数的连接数,为负数时表示尚未创建满常驻连接", ("pool",),
+                              function=lambda: _pool_status("overflow"))
+
+
+class InstrumentedPoolMixin:
+    """记录获取连接的等待时间以及超时次数"""
+    metric_name = "default"
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts.inc(pool=self.metric_name)
+            raise
+        finally:
+            pool_checkout_seconds.observe(perf_counter() - start, pool=self.metric_name)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metric_name = self.metric_name
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> None:
+    """注册引擎的连接池指标
+
+    Args:
+        engine: Engine或AsyncEngine,连接池需为InstrumentedQueuePool/InstrumentedAsyncQueuePool
+        name: 指标中的pool标签,如primary
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    engine.pool.metric_name = name
+    _engines[name] = engine
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        pool_connects.inc(pool=name)
+
+    @event.listens_for(engine, "invalidate")
+    def invalidate(dbapi_connection, connection_record, exception):
+        pool_invalidations.inc(pool=name, soft="false")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def soft_invalidate(dbapi_connection, connection_record, exception):
+        pool_invalidations.inc(pool=name, soft="true")
+
+
+def pool_stats() -> list[dict]:
+    """各连接池的当前状态"""
+    return [dict(pool=name,
+                 size=engine.pool.size(),
+                 checked_out=engine.pool.checkedout(),
+                 checked_in=engine.pool.checkedin(),
+                 overflow=engine.pool.overflow(),
+                 timeout=engine.pool.timeout())
+            for name, engine in _engines.items() if isinstance(engine.pool, QueuePool)]
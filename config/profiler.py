@@ -0,0 +1,76 @@
+import sys
+import threading
+from collections import Counter
+from typing import Callable
+
+# 空闲线程的栈顶函数,默认不计入采样:线程池等待任务、事件循环等待IO
+IDLE_FRAMES = {
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "queue:Queue.get",
+    "concurrent.futures.thread:_worker",
+    "selectors:EpollSelector.select",
+    "selectors:KqueueSelector.select",
+    "selectors:SelectSelector.select",
+    "selectors:PollSelector.select",
+}
+
+
+def frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+class StackSampler:
+    """调用栈采样器;后台线程定时采集所有线程的调用栈,按折叠栈(collapsed stack)汇总,
+    输出可直接用于flamegraph.pl或speedscope
+
+    Args:
+        interval: 采样间隔(秒)
+        gate: 返回False时跳过本次采样,None表示一直采样
+        include_idle: 是否计入空闲线程
+    """
+
+    def __init__(self, interval: float = 0.005, gate: Callable[[], bool] | None = None,
+                 include_idle: bool = False) -> None:
+        self.interval = interval
+        self.gate = gate
+        self.include_idle = include_idle
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.gate is not None and not self.gate():
+                continue
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if not self.include_idle and frame_label(frame) in IDLE_FRAMES:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)).replace(" ", "_"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """折叠栈文本,每行为: 线程;函数;...;函数 次数"""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
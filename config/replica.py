@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from itertools import count
+from time import time
+from typing import Any, Callable
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, make_url, text
+
+
+@dataclass
+class Replica:
+    """只读副本"""
+    # 隐藏密码后的连接串
+    name: str
+    # Engine,异步模式下为AsyncEngine
+    engine: Any
+    session_maker: Callable
+    healthy: bool = True
+    # 被标记为不可用后,在该时间戳之前不再分配请求
+    down_until: float = 0
+    failures: int = 0
+    checkouts: int = 0
+
+
+class ReplicaPool:
+    """只读副本池;按轮询分配健康的副本,副本断连或健康检查失败后暂停分配
+
+    Args:
+        urls: 副本连接串列表
+        engine_factory: 根据连接串创建Engine(或AsyncEngine)
+        session_factory: 根据Engine创建sessionmaker
+        down_seconds: 副本不可用后暂停分配的时间(秒),到期后重新尝试
+    """
+
+    def __init__(self, urls: list[str], engine_factory: Callable, session_factory: Callable,
+                 down_seconds: float = 30) -> None:
+        self.down_seconds = down_seconds
+        self.replicas: list[Replica] = []
+        self._counter = count()
+
+        for url in urls:
+            engine = engine_factory(url)
+            replica = Replica(name=make_url(url).render_as_string(hide_password=True),
+                              engine=engine,
+                              session_maker=session_factory(engine))
+            event.listen(getattr(engine, "sync_engine", engine), "handle_error",
+                         self._error_listener(replica))
+            self.replicas.append(replica)
+
+    def _error_listener(self, replica: Replica) -> Callable:
+        def handle_error(context):
+            # 连接断开或建立连接失败
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(replica)
+        return handle_error
+
+    def choose(self) -> Replica | None:
+        """轮询选择可用的副本,全部不可用时返回None"""
+        now = time()
+        total = len(self.replicas)
+        for _ in range(total):
+            replica = self.replicas[next(self._counter) % total]
+            if replica.healthy or replica.down_until <= now:
+                replica.checkouts += 1
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica) -> None:
+        replica.healthy = False
+        replica.down_until = time() + self.down_seconds
+        replica.failures += 1
+
+    @staticmethod
+    def _ping(engine) -> None:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        """健康检查:对每个副本执行SELECT 1,更新可用状态"""
+        for replica in self.replicas:
+            try:
+                if hasattr(replica.engine, "sync_engine"):
+                    async with replica.engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+                else:
+                    await run_in_threadpool(self._ping, replica.engine)
+            except Exception:
+                self.mark_down(replica)
+            else:
+                replica.healthy = True
+                replica.down_until = 0
+
+    def stats(self) -> list[dict]:
+        """副本的可用状态以及分配次数"""
+        return [dict(name=replica.name,
+                     healthy=replica.healthy,
+                     failures=replica.failures,
+                     checkouts=replica.checkouts)
+                for replica in self.replicas]
+
+    def __len__(self) -> int:
+        return len(self.replicas)
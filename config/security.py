@@ -1,12 +1,162 @@
+import asyncio
+import hmac
+from hashlib import sha256
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from time import perf_counter
+from typing import Callable
 from uuid import uuid4
 from jhu.security import AESAPI, HashAPI, JWTAPI
+from .cache import TTLCache
 from .settings import settings
 
 
 jwt_api = JWTAPI(key=settings.jwt_key, expire_min=settings.jwt_expire_min)
 
+
+class JWTRevoked(Exception):
+    """JWT已被吊销"""
+
+
+class JWTCache:
+    """已验证JWT的缓存;相同token在有效期内重复请求时跳过签名验证
+
+    缓存以token的sha256摘要为key,保存解码后的声明,条目在token过期时失效
+
+    Args:
+        max_size: 最大缓存条目数,0表示不缓存
+        revocation_hook: 吊销判断钩子,入参为解码后的声明,返回True表示已吊销;缓存命中时同样会调用,吊销记录由钩子自行保存并在各worker间共享
+    """
+
+    def __init__(self, max_size: int, revocation_hook: Callable[[dict], bool] | None = None) -> None:
+        self.cache = TTLCache(max_size=max_size)
+        self.revocation_hook = revocation_hook
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return sha256(token.encode()).hexdigest()
+
+    def decode(self, token: str) -> dict:
+        """解码JWT的token,优先读取缓存"""
+        key = self.digest(token)
+
+        if (claims := self.cache.get(key)) is None:
+            claims = jwt_api.decode(token)
+            self.cache.set(key, claims, expire_at=claims.get("exp"))
+
+        if self.revocation_hook is not None and self.revocation_hook(claims):
+            self.cache.pop(key)
+            raise JWTRevoked("Token has been revoked")
+
+        return claims
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+jwt_cache = JWTCache(max_size=settings.jwt_cache_size)
+
 hash_api = HashAPI()
 
+
+class HashPoolBusy(Exception):
+    """密码哈希任务排队已满"""
+
+
+def _hash(plain_text: str) -> str:
+    return hash_api.hash(plain_text)
+
+
+def _verify(plain_text: str, hash_text: str) -> bool:
+    return hash_api.verify(plain_text, hash_text)
+
+
+class HashExecutor:
+    """密码哈希执行器;在线程池或进程池中执行hash/verify,避免KDF计算阻塞事件循环
+
+    Args:
+        mode: thread或process;bcrypt计算时会释放GIL,线程池即可利用多核
+        max_workers: 并发执行数
+        max_queue: 最大排队数,超出时抛出HashPoolBusy
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 64) -> None:
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+
+        # 统计信息,仅在事件循环线程中更新
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            pool = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    async def _submit(self, func, *args):
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HashPoolBusy("登录请求繁忙,请稍后重试")
+
+        self.in_flight += 1
+        self.submitted += 1
+        start = perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BaseException:
+            # 执行失败或被取消的任务不计入完成数以及平均耗时
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            self.total_seconds += perf_counter() - start
+            return result
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, plain_text: str) -> str:
+        """明文哈希加密"""
+        return await self._submit(_hash, plain_text)
+
+    async def verify(self, plain_text: str, hash_text: str) -> bool:
+        """验证明文和密文的内容是否一致"""
+        return await self._submit(_verify, plain_text, hash_text)
+
+    def stats(self) -> dict:
+        """执行池饱和度信息"""
+        running = min(self.in_flight, self.max_workers)
+        return dict(mode=self.mode,
+                    max_workers=self.max_workers,
+                    max_queue=self.max_queue,
+                    in_flight=self.in_flight,
+                    running=running,
+                    queued=self.in_flight - running,
+                    saturation=round(self.in_flight / (self.max_workers + self.max_queue), 4),
+                    submitted=self.submitted,
+                    completed=self.completed,
+                    failed=self.failed,
+                    rejected=self.rejected,
+                    avg_ms=round(self.total_seconds * 1000 / self.completed, 3) if self.completed else 0
+                    )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hash_executor = HashExecutor(mode=settings.hash_pool_mode,
+                             max_workers=settings.hash_pool_workers,
+                             max_queue=settings.hash_pool_max_queue)
+
 # 用于处理客户端加密:比如加解密登录密码
 client_aes_api = AESAPI(settings.aes_key_32)
 
@@ -14,6 +164,25 @@ client_aes_api = AESAPI(settings.aes_key_32)
 server_aes_api = AESAPI(settings.aes_key_16)
 
 
+class PhoneSegmentTable:
+    """手机号分段密文对照表
+
+    ECB模式下同样的明文输出同样的密文,而分段明文只有000~999以及不足3位的尾段,
+    因此预先计算全部分段的密文,加解密时直接查表
+    """
+
+    def __init__(self, aes_api: AESAPI) -> None:
+        segments = [f"{i:0{n}d}" for n in (1, 2, 3) for i in range(10**n)]
+        self.encrypt_map = {segment: aes_api.encrypt(segment) for segment in segments}
+        self.decrypt_map = {v: k for k, v in self.encrypt_map.items()}
+
+
+@lru_cache
+def phone_segment_table(key: str) -> PhoneSegmentTable:
+    """获取密钥对应的分段密文对照表,首次使用时构建"""
+    return PhoneSegmentTable(AESAPI(key))
+
+
 def phone_encrypt(plain_text: str) -> str:
     """加密手机号;手机号按照每3位组成一段密文,然后拼接而成;
     如:18012345678,分为 180,801,012,123,......678;  
@@ -25,10 +194,47 @@ def phone_encrypt(plain_text: str) -> str:
     Return:
         str:加密后的手机号
     """
+    encrypt_map = phone_segment_table(settings.aes_key_16).encrypt_map
+    return _phone_to_segments(encrypt_map, plain_text)
+
+
+def phone_encrypt_many(plain_texts: list[str]) -> list[str]:
+    """批量加密手机号,用于账号批量导入
+
+    Args:
+        plain_texts:手机号明文列表
+
+    Return:
+        list[str]:加密后的手机号列表,顺序与入参一致
+    """
+    encrypt_map = phone_segment_table(settings.aes_key_16).encrypt_map
+    return [_phone_to_segments(encrypt_map, v) for v in plain_texts]
+
+
+def _phone_to_segments(encrypt_map: dict, plain_text: str) -> str:
+    """按分段查表拼接手机号密文,表中不存在的分段(如非数字)使用AES加密"""
     if (length := len(plain_text)) == 0:
         return ""
     end_pos = max(length-3, 0)
-    return ",".join([server_aes_api.encrypt(plain_text[i:i+3]) for i in range(end_pos+1)])
+    segments = [plain_text[i:i+3] for i in range(end_pos+1)]
+    return ",".join([encrypt_map.get(v) or server_aes_api.encrypt(v) for v in segments])
+
+
+def phone_tokens(plain_text: str) -> list[str]:
+    """手机号的分段盲索引;与phone_encrypt相同按3位分段,每段计算HMAC摘要并去重
+    摘要仅用于索引等值查找,无法还原手机号明文
+
+    Args:
+        plain_text:手机号明文,例如:18012345678
+
+    Return:
+        list[str]:分段摘要列表
+    """
+    if (length := len(plain_text)) == 0:
+        return []
+    key = settings.phone_index_key.encode()
+    segments = {plain_text[i:i+3] for i in range(max(length-3, 0)+1)}
+    return [hmac.new(key, segment.encode(), sha256).hexdigest() for segment in segments]
 
 
 def phone_decrypy(encrypted_text: str, mask: bool = True) -> str:
@@ -44,7 +250,27 @@ def phone_decrypy(encrypted_text: str, mask: bool = True) -> str:
     if not encrypted_text:
         return ""
 
-    phone_array = [server_aes_api.decrypt(v)
+    decrypt_map = phone_segment_table(settings.aes_key_16).decrypt_map
+    return _phone_from_segments(decrypt_map, encrypted_text, mask)
+
+
+def phone_decrypt_many(encrypted_texts: list[str], mask: bool = True) -> list[str]:
+    """批量解密手机号,用于列表分页数据
+
+    Args:
+        encrypted_texts:加密的手机号列表
+        mask: 是否脱敏显示,比如180****5678
+
+    Return:
+        list[str]:手机号明文列表,顺序与入参一致
+    """
+    decrypt_map = phone_segment_table(settings.aes_key_16).decrypt_map
+    return [_phone_from_segments(decrypt_map, v, mask) if v else "" for v in encrypted_texts]
+
+
+def _phone_from_segments(decrypt_map: dict, encrypted_text: str, mask: bool) -> str:
+    """按分段查表还原手机号,表中不存在的分段使用AES解密"""
+    phone_array = [decrypt_map.get(v) or server_aes_api.decrypt(v)
                    for v in encrypted_text.split(",")]
 
     phone = "".join([phone_array[i][0] for i in range(8)]) + phone_array[-1]
@@ -0,0 +1,146 @@
+import heapq
+import logging
+import re
+import sys
+from itertools import count
+from threading import Lock
+from time import perf_counter, time
+from sqlalchemy import event
+from .metrics import metrics
+
+logger = logging.getLogger("api.sql")
+
+# schema层的包名,用于定位发起查询的函数;schema.orm为通用的查询助手,继续向上查找
+SCHEMA_PACKAGE = __name__.rsplit(".", 2)[0] + ".schema"
+SCHEMA_HELPERS = (SCHEMA_PACKAGE + ".orm",)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*(?:\?|%s|:\w+|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|:\w+|%\(\w+\)s))+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# 语句汇总的最大条目数
+MAX_STATEMENTS = 1000
+
+sql_statement_seconds = metrics.histogram("db_statement_duration_seconds",
+                                          "SQL语句的执行耗时(秒),按发起查询的schema函数统计", ("caller",))
+
+
+def normalize_sql(statement: str) -> str:
+    """归一化SQL:字面量替换为?,IN列表的多个占位符合并为(...),合并空白"""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDERS.sub("(...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def schema_caller() -> str:
+    """调用栈中最近的schema层函数,如UserAPI.get_account_list"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(SCHEMA_PACKAGE) and not module.startswith(SCHEMA_HELPERS):
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class SQLTracer:
+    """SQL语句跟踪;基于引擎事件记录语句耗时,慢查询写日志并保留时间窗口内最慢的N条
+
+    Args:
+        slow_ms: 慢查询阈值(毫秒),超过时记录warning日志
+        top_n: 保留的最慢语句条数
+        window_seconds: 最慢语句的统计窗口(秒),超出窗口的记录被丢弃
+    """
+
+    def __init__(self, slow_ms: float = 200, top_n: int = 50, window_seconds: float = 3600) -> None:
+        self.slow_ms = slow_ms
+        self.top_n = top_n
+        self.window_seconds = window_seconds
+
+        self._slowest: list[tuple] = []
+        self._statements: dict[tuple[str, str], dict] = {}
+        self._seq = count()
+        self._lock = Lock()
+        self._pruned_at = time()
+
+    def attach(self, engine) -> None:
+        """在引擎(或AsyncEngine)上注册跟踪事件"""
+        engine = getattr(engine, "sync_engine", engine)
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_trace_start", []).append(perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("sql_trace_start")
+        if not started:
+            return
+        elapsed_ms = (perf_counter() - started.pop()) * 1000
+
+        # 大部分驱动在SELECT后返回缓冲的行数,无法获取时为None
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        self.record(normalize_sql(statement), schema_caller(), elapsed_ms, rows)
+
+    @staticmethod
+    def _handle_error(context) -> None:
+        """执行失败时after_cursor_execute不会触发,丢弃对应的开始时间,避免后续语句的耗时错位"""
+        conn = context.connection
+        if conn is not None and (started := conn.info.get("sql_trace_start")):
+            started.pop()
+
+    def record(self, sql: str, caller: str, elapsed_ms: float, rows: int | None) -> None:
+        sql_statement_seconds.observe(elapsed_ms / 1000, caller=caller)
+
+        if elapsed_ms >= self.slow_ms:
+            logger.warning("slow sql %.1fms caller=%s rows=%s: %s", elapsed_ms, caller, rows, sql)
+
+        now = time()
+        with self._lock:
+            key = (sql, caller)
+            if key in self._statements or len(self._statements) < MAX_STATEMENTS:
+                stats = self._statements.setdefault(key, dict(count=0, total_ms=0.0, max_ms=0.0))
+                stats["count"] += 1
+                stats["total_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+            if now - self._pruned_at > 1:
+                self._prune(now)
+
+            item = (elapsed_ms, next(self._seq), now, sql, caller, rows)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, item)
+            elif self._slowest and elapsed_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def _prune(self, now: float) -> None:
+        """丢弃统计窗口之外的最慢语句"""
+        self._slowest = [item for item in self._slowest if now - item[2] <= self.window_seconds]
+        heapq.heapify(self._slowest)
+        self._pruned_at = now
+
+    def dump(self) -> dict:
+        """最慢的语句(按耗时倒序)以及按总耗时排序的语句汇总"""
+        with self._lock:
+            self._prune(time())
+            slowest = sorted(self._slowest, reverse=True)
+            statements = sorted(self._statements.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+
+        return dict(slow_ms=self.slow_ms,
+                    window_seconds=self.window_seconds,
+                    slowest=[dict(sql=sql, caller=caller, rows=rows, ms=round(ms, 3), at=at)
+                             for ms, _, at, sql, caller, rows in slowest],
+                    statements=[dict(sql=sql, caller=caller, count=v["count"],
+                                     total_ms=round(v["total_ms"], 3),
+                                     avg_ms=round(v["total_ms"] / v["count"], 3),
+                                     max_ms=round(v["max_ms"], 3))
+                                for (sql, caller), v in statements[:self.top_n]])
+
+    def reset(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._statements.clear()
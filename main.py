@@ -1,20 +1,73 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.config.settings import settings
+from api.config.security import hash_executor, phone_segment_table
+from api.schema.profile import cache_bus
+from api.schema.refdata import refdata
 from api.service import router
+from api.service.base import db_call, primary_session, replica_pool, ReplicaStickyMiddleware
+from api.service.metrics import MetricsMiddleware, track_in_flight
+from api.service.profile import ProfilingMiddleware
+
+
+logger = logging.getLogger("api")
+
+
+async def load_refdata() -> None:
+    """预加载参考数据快照;失败时由第一个请求加载"""
+    try:
+        await db_call(refdata.load, primary_session())
+    except Exception:
+        logger.warning("参考数据快照预加载失败", exc_info=True)
+
+
+async def check_replicas() -> None:
+    """定时检查只读副本的可用状态"""
+    while True:
+        await replica_pool.check()
+        await asyncio.sleep(settings.db_replica_check_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期:启动时预热手机号分段密文表以及参考数据快照,开始副本健康检查以及缓存失效广播,
+    退出时释放执行池等资源"""
+    phone_segment_table(settings.aes_key_16)
+    replica_task = asyncio.create_task(check_replicas()) if len(replica_pool) else None
+    await cache_bus.start()
+    await load_refdata()
+    yield
+    await cache_bus.stop()
+    if replica_task is not None:
+        replica_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await replica_task
+    hash_executor.shutdown()
 
 
 def init_app() -> FastAPI:
     """初始化应用"""
-    app = FastAPI(**settings.fastapi_kwargs)
+    app = FastAPI(lifespan=lifespan, **settings.fastapi_kwargs)
 
-    app.include_router(router)
+    app.include_router(router, dependencies=[Depends(track_in_flight)] if settings.metrics_enable else None)
 
     app.add_middleware(
         CORSMiddleware,
         **settings.fastapi_cors_kwargs
     )
 
+    if len(replica_pool):
+        app.add_middleware(ReplicaStickyMiddleware)
+
+    if settings.metrics_enable:
+        app.add_middleware(MetricsMiddleware)
+
+    if settings.profiling_enable:
+        app.add_middleware(ProfilingMiddleware)
+
     return app
 
 
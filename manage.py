@@ -0,0 +1,26 @@
+from argparse import ArgumentParser
+from api.service.base import local_session
+from api.schema.user import UserAPI
+
+
+def backfill_phone_tokens(args) -> None:
+    """回填手机号分段索引"""
+    with local_session() as session:
+        total = UserAPI.backfill_phone_tokens(session, args.chunk_size)
+    print(f"backfill phone tokens: {total} users")
+
+
+def main() -> None:
+    parser = ArgumentParser(description="OneAPI管理命令")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("backfill-phone-tokens", help="回填手机号分段索引")
+    cmd.add_argument("--chunk-size", type=int, default=1000, help="每批处理的用户数")
+    cmd.set_defaults(func=backfill_phone_tokens)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
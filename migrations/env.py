@@ -0,0 +1,52 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from api.config.settings import settings
+from api.model.base import ModelBase
+from api.model import app, org, role, user  # noqa: F401, 注册所有模型
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = ModelBase.metadata
+
+
+def get_url() -> str:
+    """数据库连接:-x url=... 优先,其次为配置文件,最后为APISettings.db_rds"""
+    return (context.get_x_argument(as_dictionary=True).get("url")
+            or config.get_main_option("sqlalchemy.url")
+            or settings.db_rds)
+
+
+def run_migrations_offline() -> None:
+    """生成SQL脚本,不连接数据库"""
+    context.configure(url=get_url(),
+                      target_metadata=target_metadata,
+                      literal_binds=True,
+                      dialect_opts={"paramstyle": "named"})
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """连接数据库执行迁移;以编程方式调用时可通过config.attributes["connection"]传入连接"""
+    if (connection := config.attributes.get("connection")) is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,144 @@
+"""baseline: 初始数据表
+
+已有数据库可执行 alembic stamp 0001 标记为当前版本
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def base_columns() -> list[sa.Column]:
+    """ModelBase的公共字段"""
+    return [
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+                  primary_key=True, autoincrement=True, comment="ID"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建数据时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新数据时间"),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "t_user",
+        *base_columns(),
+        sa.Column("user_uuid", sa.String(32), nullable=False, unique=True, comment="用户UUID"),
+        sa.Column("account", sa.String(64), nullable=False, unique=True, comment="用户账号"),
+        sa.Column("nick_name", sa.String(64), nullable=False, comment="用户昵称"),
+        sa.Column("phone_enc", sa.String(256), nullable=False, comment="用户手机号(加密)"),
+        sa.Column("avatar_url", sa.String(256), nullable=False, comment="用户头像url"),
+        sa.Column("user_status", sa.SmallInteger(), nullable=False, comment="用户状态;0:停用,1:启用"),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False, comment="逻辑删除标识"),
+        comment="用户信息"
+    )
+
+    op.create_table(
+        "t_user_auth",
+        *base_columns(),
+        sa.Column("user_uuid", sa.String(32), nullable=False, comment="用户UUID"),
+        sa.Column("auth_type", sa.SmallInteger(), nullable=False, comment="认证类型"),
+        sa.Column("auth_identify", sa.String(128), nullable=False, comment="认证类型标识"),
+        sa.Column("auth_value", sa.String(256), nullable=False, comment="认证值"),
+        sa.UniqueConstraint("user_uuid", "auth_type", "auth_identify", name="uni_user_auth"),
+        comment="用户认证信息"
+    )
+
+    op.create_table(
+        "t_org",
+        *base_columns(),
+        sa.Column("org_uuid", sa.String(32), nullable=False, unique=True, comment="组织UUID"),
+        sa.Column("org_name", sa.String(64), nullable=False, unique=True, comment="组织名称"),
+        sa.Column("owner_uuid", sa.String(32), nullable=False, comment="组织所有者UUID"),
+        sa.Column("org_remark", sa.String(256), nullable=False, comment="组织备注信息"),
+        sa.Column("org_status", sa.SmallInteger(), nullable=False, comment="组织状态"),
+        sa.Column("is_admin", sa.Boolean(), nullable=False, comment="管理员级组织标识"),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False, comment="逻辑删除标识"),
+        comment="组织信息"
+    )
+
+    op.create_table(
+        "t_org_user",
+        *base_columns(),
+        sa.Column("org_uuid", sa.String(32), nullable=False, comment="组织UUID"),
+        sa.Column("user_uuid", sa.String(32), nullable=False, comment="用户UUID"),
+        sa.Column("org_user_name", sa.String(64), nullable=False, comment="用户在组织内的名称"),
+        sa.Column("org_user_avatar_url", sa.String(256), nullable=False, comment="用户在组织内的头像URL"),
+        sa.Column("org_user_status", sa.SmallInteger(), nullable=False, comment="用户在组织内的状态"),
+        sa.UniqueConstraint("org_uuid", "user_uuid", name="uni_org_user"),
+        comment="组织用户信息"
+    )
+
+    op.create_table(
+        "t_org_user_role",
+        *base_columns(),
+        sa.Column("org_uuid", sa.String(32), nullable=False, comment="组织UUID"),
+        sa.Column("user_uuid", sa.String(32), nullable=False, comment="用户UUID"),
+        sa.Column("role_id", sa.BigInteger(), nullable=False, comment="角色ID"),
+        comment="组织用户角色信息"
+    )
+
+    op.create_table(
+        "t_org_app",
+        *base_columns(),
+        sa.Column("org_uuid", sa.String(32), nullable=False, comment="组织UUID"),
+        sa.Column("app_id", sa.BigInteger(), nullable=False, comment="应用ID"),
+        sa.Column("org_app_status", sa.SmallInteger(), nullable=False, comment="组织应用状态"),
+        comment="组织应用信息"
+    )
+
+    op.create_table(
+        "t_role",
+        *base_columns(),
+        sa.Column("role_name", sa.String(64), nullable=False, comment="角色名"),
+        sa.Column("org_uuid", sa.String(32), nullable=False,
+                  comment="角色所属组织,空表示默认角色,可在所有组织下使用"),
+        sa.Column("role_remark", sa.String(256), nullable=False, comment="角色备注"),
+        sa.Column("role_status", sa.SmallInteger(), nullable=False, comment="角色状态"),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False, comment="逻辑删除标识"),
+        comment="角色信息"
+    )
+
+    op.create_table(
+        "t_app",
+        *base_columns(),
+        sa.Column("app_name", sa.String(64), nullable=False, unique=True, comment="应用名称"),
+        sa.Column("app_remark", sa.String(256), nullable=False, comment="应用备注"),
+        sa.Column("app_status", sa.SmallInteger(), nullable=False, comment="应用状态"),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False, comment="逻辑删除标识"),
+        comment="应用信息"
+    )
+
+    op.create_table(
+        "t_app_service",
+        *base_columns(),
+        sa.Column("app_id", sa.BigInteger(), nullable=False, comment="应用ID"),
+        sa.Column("service_name", sa.String(64), nullable=False, comment="应用服务名称"),
+        sa.Column("service_tag", sa.String(128), nullable=False, comment="应用服务标识"),
+        sa.UniqueConstraint("app_id", "service_tag", name="uni_app_service"),
+        comment="应用鉴权服务"
+    )
+
+    op.create_table(
+        "t_app_role",
+        *base_columns(),
+        sa.Column("app_id", sa.BigInteger(), nullable=False, comment="应用ID"),
+        sa.Column("role_id", sa.BigInteger(), nullable=False, comment="角色ID"),
+        sa.Column("org_uuid", sa.String(32), nullable=False, comment="角色所属组织"),
+        sa.Column("app_service_id", sa.BigInteger(), nullable=False, comment="应用鉴权服务ID"),
+        sa.Column("data_scope_dept", sa.SmallInteger(), nullable=False, comment="部门数据权限"),
+        sa.Column("data_scope_region", sa.SmallInteger(), nullable=False, comment="地区数据权限"),
+        comment="应用角色信息"
+    )
+
+
+def downgrade() -> None:
+    for table in ["t_app_role", "t_app_service", "t_app", "t_role", "t_org_app",
+                  "t_org_user_role", "t_org_user", "t_org", "t_user_auth", "t_user"]:
+        op.drop_table(table)
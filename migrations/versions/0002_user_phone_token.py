@@ -0,0 +1,34 @@
+"""t_user_phone_token: 手机号分段盲索引
+
+创建后执行 python -m api.manage backfill-phone-tokens 回填已有用户
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "t_user_phone_token",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+                  primary_key=True, autoincrement=True, comment="ID"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建数据时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新数据时间"),
+        sa.Column("token_hash", sa.String(64), nullable=False, comment="手机号3位分段的HMAC摘要"),
+        sa.Column("user_uuid", sa.String(32), nullable=False, comment="用户UUID"),
+        sa.UniqueConstraint("token_hash", "user_uuid", name="uni_phone_token"),
+        comment="用户手机号分段索引"
+    )
+    op.create_index("ix_t_user_phone_token_user_uuid", "t_user_phone_token", ["user_uuid"])
+
+
+def downgrade() -> None:
+    op.drop_table("t_user_phone_token")
@@ -0,0 +1,50 @@
+"""热点查询索引
+
+| 索引                         | 查询                                                        |
+| ---------------------------- | ----------------------------------------------------------- |
+| t_user_auth.idx_user_auth_login | AuthAPI.get_login_info 认证信息(覆盖auth_value)          |
+| t_org_user.idx_org_user_status  | get_login_info/get_user_org_list/get_account_orgs        |
+| t_org.idx_org_owner             | check_superadmin/check_org_owner                         |
+| t_org.idx_org_deleted_created   | OrgAPI.get_org_list 排序分页                             |
+| t_user.idx_user_deleted_created | UserAPI.get_account_list 排序分页                        |
+| t_user.idx_user_phone_enc       | check_account_unique 手机号唯一性                        |
+| t_role.idx_role_org             | RoleAPI.get_role_list/get_detail                         |
+| t_app_role.idx_app_role_org_role | 权限索引编译(PermissionIndex.load)                      |
+| t_org_user_role.uni_org_user_role | 权限索引编译(PermissionIndex.load),见0004               |
+
+t_app_service 按app_id过滤并按service_tag排序,由已有的uni_app_service(app_id, service_tag)支持
+
+idx_org_user_role(org_uuid, user_uuid)是0004唯一约束uni_org_user_role的前缀,由0004删除
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("idx_user_auth_login", "t_user_auth", ["user_uuid", "auth_type", "auth_identify", "auth_value"]),
+    ("idx_org_user_status", "t_org_user", ["user_uuid", "org_user_status"]),
+    ("idx_org_owner", "t_org", ["owner_uuid", "is_deleted"]),
+    ("idx_org_deleted_created", "t_org", ["is_deleted", "created_at"]),
+    ("idx_user_deleted_created", "t_user", ["is_deleted", "created_at"]),
+    ("idx_user_phone_enc", "t_user", ["phone_enc"]),
+    ("idx_role_org", "t_role", ["org_uuid", "is_deleted", "created_at"]),
+    ("idx_app_role_org_role", "t_app_role", ["org_uuid", "role_id"]),
+    ("idx_org_user_role", "t_org_user_role", ["org_uuid", "user_uuid"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
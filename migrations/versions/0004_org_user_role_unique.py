@@ -0,0 +1,33 @@
+"""t_org_user_role: (org_uuid, user_uuid, role_id)唯一约束
+
+批量分配角色时按该约束upsert;创建前先删除已有的重复数据,保留id最小的一行。
+0003的idx_org_user_role(org_uuid, user_uuid)是该约束的前缀,查询可直接使用约束的索引,一并删除
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # MySQL不允许在DELETE的子查询中直接引用被删除的表,通过派生表绕开
+    op.execute("DELETE FROM t_org_user_role WHERE id NOT IN ("
+               "SELECT id FROM (SELECT MIN(id) AS id FROM t_org_user_role "
+               "GROUP BY org_uuid, user_uuid, role_id) AS keep)")
+
+    # SQLite不支持ALTER TABLE ADD CONSTRAINT,batch模式下会重建表
+    with op.batch_alter_table("t_org_user_role") as batch_op:
+        batch_op.create_unique_constraint("uni_org_user_role", ["org_uuid", "user_uuid", "role_id"])
+        batch_op.drop_index("idx_org_user_role")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("t_org_user_role") as batch_op:
+        batch_op.create_index("idx_org_user_role", ["org_uuid", "user_uuid"])
+        batch_op.drop_constraint("uni_org_user_role", type_="unique")
@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import SmallInteger, String, Boolean, BigInteger, UniqueConstraint
+from sqlalchemy import SmallInteger, String, Boolean, BigInteger, Index, UniqueConstraint
 from .base import ModelBase, M, mc
 
 
@@ -77,6 +77,7 @@ class AppService(ModelBase):
 class AppRole(ModelBase):
     __tablename__ = "t_app_role"
     __table_args__ = (
+        Index("idx_app_role_org_role", "org_uuid", "role_id"),
         {"comment": "应用角色信息"}
     )
 
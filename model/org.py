@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import Boolean, SmallInteger, String, BigInteger, UniqueConstraint
+from sqlalchemy import Boolean, SmallInteger, String, BigInteger, Index, UniqueConstraint
 from .base import ModelBase, M, mc
 
 
@@ -21,6 +21,8 @@ class OrgAppStatus(Enum):
 class Org(ModelBase):
     __tablename__ = "t_org"
     __table_args__ = (
+        Index("idx_org_owner", "owner_uuid", "is_deleted"),
+        Index("idx_org_deleted_created", "is_deleted", "created_at"),
         {"comment": "组织信息"}
     )
 
@@ -67,6 +69,7 @@ class OrgUser(ModelBase):
     __table_args__ = (
         UniqueConstraint("org_uuid", "user_uuid",
                          name="uni_org_user"),
+        Index("idx_org_user_status", "user_uuid", "org_user_status"),
         {"comment": "组织用户信息"}
     )
 
@@ -99,6 +102,8 @@ class OrgUser(ModelBase):
 class OrgUserRole(ModelBase):
     __tablename__ = "t_org_user_role"
     __table_args__ = (
+        UniqueConstraint("org_uuid", "user_uuid", "role_id",
+                         name="uni_org_user_role"),
         {"comment": "组织用户角色信息"}
     )
 
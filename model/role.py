@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import String, SmallInteger, Boolean
+from sqlalchemy import String, SmallInteger, Boolean, Index
 from .base import ModelBase, M, mc
 
 
@@ -11,6 +11,7 @@ class RoleStatus(Enum):
 class Role(ModelBase):
     __tablename__ = "t_role"
     __table_args__ = (
+        Index("idx_role_org", "org_uuid", "is_deleted", "created_at"),
         {"comment": "角色信息"}
     )
 
@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import String, SmallInteger, Boolean, UniqueConstraint
+from sqlalchemy import String, SmallInteger, Boolean, Index, UniqueConstraint
 from .base import ModelBase, M, mc
 
 
@@ -16,6 +16,8 @@ class UserAuthType(Enum):
 class User(ModelBase):
     __tablename__ = "t_user"
     __table_args__ = (
+        Index("idx_user_deleted_created", "is_deleted", "created_at"),
+        Index("idx_user_phone_enc", "phone_enc"),
         {"comment": "用户信息"}
     )
 
@@ -62,6 +64,8 @@ class UserAuth(ModelBase):
     __table_args__ = (
         UniqueConstraint("user_uuid", "auth_type", "auth_identify",
                          name="uni_user_auth"),
+        Index("idx_user_auth_login", "user_uuid", "auth_type",
+              "auth_identify", "auth_value"),
         {"comment": "用户认证信息"}
     )
 
@@ -84,3 +88,23 @@ class UserAuth(ModelBase):
                             default="",
                             comment="认证值"
                             )
+
+
+class UserPhoneToken(ModelBase):
+    __tablename__ = "t_user_phone_token"
+    __table_args__ = (
+        UniqueConstraint("token_hash", "user_uuid",
+                         name="uni_phone_token"),
+        {"comment": "用户手机号分段索引"}
+    )
+
+    token_hash: M[str] = mc(String(64),
+                            default="",
+                            comment="手机号3位分段的HMAC摘要"
+                            )
+
+    user_uuid: M[str] = mc(String(32),
+                           index=True,
+                           default="",
+                           comment="用户UUID"
+                           )
@@ -40,6 +40,53 @@ class AuthAPI:
 
         return ORM.one(session, stmt)
 
+    @staticmethod
+    def get_login_info(session: Session,
+                       account: str,
+                       auth_type: UserAuthType = UserAuthType.PASSWORD,
+                       auth_identify: str = ""
+                       ) -> dict | None:
+        """获取登录信息:账户的认证信息以及用户有效的组织信息,一次查询返回
+
+        Return:
+            None:账户或认证方式不存在
+            dict:get_account_auth_info的字段,以及org_list(同get_user_org_list)
+        """
+        stmt = select(
+            User.user_uuid,
+            User.user_status,
+            UserAuth.auth_value,
+            Org.org_uuid,
+            Org.org_name,
+            Org.owner_uuid,
+            Org.is_admin,
+            OrgUser.org_user_status
+        ).join_from(
+            User, UserAuth, User.user_uuid == UserAuth.user_uuid
+        ).outerjoin(
+            OrgUser, and_(OrgUser.user_uuid == User.user_uuid,
+                          OrgUser.org_user_status == OrgUserStatus.ENABLE.value)
+        ).outerjoin(
+            Org, and_(Org.org_uuid == OrgUser.org_uuid,
+                      Org.is_deleted == False,
+                      Org.org_status == OrgStatus.ENABLE.value)
+        ).where(and_(
+            User.is_deleted == False,
+            User.account == account,
+            UserAuth.auth_type == auth_type.value,
+            UserAuth.auth_identify == auth_identify
+        ))
+
+        rows = ORM.all(session, stmt)
+        if not rows:
+            return None
+
+        org_keys = ["org_uuid", "org_name", "owner_uuid", "is_admin", "org_user_status"]
+        user = {k: rows[0][k] for k in ["user_uuid", "user_status", "auth_value"]}
+        user["org_list"] = [{k: row[k] for k in org_keys} for row in rows if row["org_uuid"] is not None]
+
+        return user
+
     @staticmethod
     def get_user_org_list(session: Session,
                           user_uuid: str
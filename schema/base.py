@@ -1,6 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 @dataclass
 class Jwt:
@@ -24,12 +28,35 @@ class Pagination:
     page_idx: int = 1
     page_size: int = 10
 
+    # 游标分页的游标,None表示使用页码分页,空字符串表示游标分页的首页
+    cursor: str | None = None
+
+    # 游标分页时是否统计总数
+    with_total: bool = False
+
+    # 无过滤条件时是否按表统计信息估算总数
+    estimate_total: bool = False
+
+
+@dataclass
+class Permission:
+    """组织用户的权限信息"""
+    # 可访问的服务标识(AppService.service_tag)
+    scopes: frozenset[str] = frozenset()
+
+    # 服务标识对应的数据权限:(部门数据权限,地区数据权限)
+    data_scopes: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+    def allows(self, scopes: list[str]) -> bool:
+        """是否拥有全部服务的访问权限"""
+        return self.scopes.issuperset(scopes)
+
 
 @dataclass
 class Actor:
     """操作用户信息"""
-    # 数据库会话
-    session: Session
+    # 数据库会话,异步模式下为AsyncSession
+    session: "Session | AsyncSession"
 
     # 操作用户的UUID
     user_uuid: str
@@ -40,6 +67,12 @@ class Actor:
     # 操作用户是否为组织所有者,即组织的超级管理员
     is_org_owner: bool = False
 
+    # 操作用户选择的组织是否为管理者组织(平台组织)
+    is_org_admin: bool = False
+
+    # 操作用户在组织内的权限,鉴权通过后填充
+    permission: Permission | None = None
+
 
 # @dataclass
 # class Actor:
@@ -46,6 +46,18 @@ class APIErrors:
         code=2004,
         message="组织的所有者不允许删除"
     )
+    USER_BATCH_INVALID_ROW = ErrInfo(
+        code=2005,
+        message="账号数据格式错误"
+    )
+    USER_BATCH_TOO_LARGE = ErrInfo(
+        code=2006,
+        message="单次导入的账号数量超出限制"
+    )
+    USER_BATCH_WRITE_FAILED = ErrInfo(
+        code=2007,
+        message="账号写入失败"
+    )
 
     # 组织业务
     ORG_NAME_ALREADY_EXISTS = ErrInfo(
@@ -60,3 +72,39 @@ class APIErrors:
         code=3003,
         message="无效组织所有者,账号不存在或状态异常"
     )
+    ORG_NOT_AVAIABLE = ErrInfo(
+        code=3004,
+        message="组织不存在或已删除"
+    )
+    ORG_MEMBER_USER_NOT_AVAIABLE = ErrInfo(
+        code=3005,
+        message="账号不存在或已删除"
+    )
+    ORG_MEMBER_NOT_IN_ORG = ErrInfo(
+        code=3006,
+        message="用户不是组织成员"
+    )
+    ORG_MEMBER_OWNER_REMOVE_DINED = ErrInfo(
+        code=3007,
+        message="组织所有者不允许移出组织"
+    )
+    ORG_MEMBER_ROLE_NOT_AVAIABLE = ErrInfo(
+        code=3008,
+        message="角色不存在或不属于该组织"
+    )
+    ORG_MEMBER_TOO_LARGE = ErrInfo(
+        code=3009,
+        message="单次操作的用户数量超出限制"
+    )
+    ORG_MEMBER_WRITE_FAILED = ErrInfo(
+        code=3010,
+        message="组织用户写入失败"
+    )
+    ORG_MEMBER_CTRL_DINED = ErrInfo(
+        code=3011,
+        message="仅平台组织或组织所有者可管理组织用户"
+    )
+    ORG_MEMBER_OWNER_CTRL_DINED = ErrInfo(
+        code=3012,
+        message="组织所有者已是组织用户,不允许修改组织内状态"
+    )
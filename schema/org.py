@@ -1,13 +1,24 @@
+from functools import partial
+from typing import Any, Callable
 from pydantic import BaseModel, Field
-from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy import select, update, delete, and_, or_, func
 from sqlalchemy.orm import Session
 from jhu.orm import ORM, ORMCheckRule
-from api.model.org import Org, OrgUser, OrgUserRole, OrgStatus
+from api.model.org import Org, OrgUser, OrgUserRole, OrgStatus, OrgUserStatus
+from api.model.role import Role
 from api.model.user import User, UserStatus
+from api.config.settings import settings
 from api.config.security import generate_uuid_str
 from .user import UserAPI
 from .base import Pagination, Actor
-from .errcode import APIErrors
+from .orm import paginate, invalidate_counts, upsert
+from .errcode import APIErrors, ErrInfo
+from .permission import invalidate_permission
+from .profile import invalidate_org_profile, invalidate_org_user_profile
+
+# 组织用户以及组织用户角色的唯一键,对应uni_org_user以及uni_org_user_role
+MEMBER_KEYS = ["org_uuid", "user_uuid"]
+MEMBER_ROLE_KEYS = ["org_uuid", "user_uuid", "role_id"]
 
 
 class OrgCreate(BaseModel):
@@ -28,6 +39,37 @@ class OrgDelete(BaseModel):
     org_uuid: str = Field(description="组织UUID")
 
 
+class OrgMemberAdd(BaseModel):
+    org_uuid: str = Field(description="组织UUID")
+    user_uuids: list[str] = Field(description="用户UUID列表")
+    role_ids: list[int] = Field(default=[], description="同时分配的角色ID列表")
+    org_user_status: int = Field(default=OrgUserStatus.ENABLE.value, description="用户在组织内的状态")
+
+
+class OrgMemberRemove(BaseModel):
+    org_uuid: str = Field(description="组织UUID")
+    user_uuids: list[str] = Field(description="用户UUID列表")
+
+
+class OrgMemberRole(BaseModel):
+    org_uuid: str = Field(description="组织UUID")
+    user_uuids: list[str] = Field(description="用户UUID列表")
+    role_ids: list[int] = Field(description="角色ID列表")
+    replace: bool = Field(default=False, description="是否移除用户在该组织内的其他角色")
+
+
+def member_result(user_uuid: str, err: ErrInfo, message: str = "") -> dict:
+    """组织成员批量操作的单个用户结果"""
+    return dict(user_uuid=user_uuid, code=err.code, message=message or err.message)
+
+
+def member_chunks(user_uuids: list[str]) -> list[list[str]]:
+    """去重后按org_member_chunk_size拆分,每批在一个事务内处理"""
+    user_uuids = list(dict.fromkeys(user_uuids))
+    size = settings.org_member_chunk_size
+    return [user_uuids[i:i+size] for i in range(0, len(user_uuids), size)]
+
+
 def check_org_unique(session: Session, org_name: str, except_uuid: str = None) -> APIErrors | None:
     """判断组织唯一性"""
     except_expression = None if except_uuid is None else Org.org_uuid != except_uuid
@@ -53,6 +95,80 @@ def check_admin_org(session: Session, org_uuid: str) -> bool:
     return True if ORM.counts(session, stmt) > 0 else False
 
 
+def check_member_actor(actor: Actor, org: dict) -> bool:
+    """判断操作者可以管理组织用户:平台组织的操作者、组织所有者,或已在该组织内通过服务鉴权"""
+    if actor.is_org_admin or actor.user_uuid == org["owner_uuid"]:
+        return True
+    return actor.permission is not None and actor.org_uuid == org["org_uuid"]
+
+
+def check_member_org(actor: Actor, org_uuid: str, user_uuids: list[str]) -> tuple[ErrInfo, dict | None]:
+    """组织成员批量操作的前置判断,通过时返回组织信息"""
+    session = actor.session
+    if len(user_uuids) > settings.org_member_max_users:
+        return APIErrors.ORG_MEMBER_TOO_LARGE, None
+
+    if check_admin_org(session, org_uuid) == True:
+        return APIErrors.ORG_ADMIN_CTRL_DINED, None
+
+    stmt = select(
+        Org.org_uuid,
+        Org.owner_uuid
+    ).where(and_(
+        Org.is_deleted == False,
+        Org.org_uuid == org_uuid
+    ))
+
+    if (org := ORM.one(session, stmt)) is None:
+        return APIErrors.ORG_NOT_AVAIABLE, None
+
+    # 未开启服务鉴权时任何登录用户都能调用成员接口,需确认操作者管理该组织
+    if not check_member_actor(actor, org):
+        return APIErrors.ORG_MEMBER_CTRL_DINED, None
+    return APIErrors.NO_ERROR, org
+
+
+def check_roles_available(session: Session, org_uuid: str, role_ids: list[int]) -> bool:
+    """判断角色均存在,且为该组织的角色或默认角色"""
+    role_ids = set(role_ids)
+    stmt = select(Role.id).where(and_(
+        Role.is_deleted == False,
+        Role.id.in_(role_ids),
+        Role.org_uuid.in_([org_uuid, ""])
+    ))
+
+    return ORM.counts(session, stmt) == len(role_ids)
+
+
+def get_org_members(session: Session, org_uuid: str, user_uuids: list[str]) -> set[str]:
+    """一次IN查询返回user_uuids中已是组织成员的用户"""
+    stmt = select(OrgUser.user_uuid).where(and_(
+        OrgUser.org_uuid == org_uuid,
+        OrgUser.user_uuid.in_(user_uuids)
+    ))
+
+    return set(session.scalars(stmt))
+
+
+def write_member_chunk(session: Session, results: list[dict], writes: list[Callable[[], Any]]) -> list[dict]:
+    """在一个事务内依次执行本批次的写入,失败时回滚并将本批次成功的用户标记为写入失败"""
+    try:
+        for write in writes:
+            write()
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        return [result if result["code"] != APIErrors.NO_ERROR.code
+                else member_result(result["user_uuid"], APIErrors.ORG_MEMBER_WRITE_FAILED, f"{e}")
+                for result in results]
+    return results
+
+
+def role_rows(org_uuid: str, user_uuids: list[str], role_ids: list[int]) -> list[dict]:
+    return [dict(org_uuid=org_uuid, user_uuid=user_uuid, role_id=role_id)
+            for user_uuid in user_uuids for role_id in dict.fromkeys(role_ids)]
+
+
 class OrgAPI:
     @staticmethod
     def get_org_list(actor: Actor, pagination: Pagination, org_name: str = "",  org_status: int = None):
@@ -77,8 +193,8 @@ class OrgAPI:
             *expressions
         ))
 
-        return ORM.pagination(actor.session, stmt, pagination.page_idx,
-                              pagination.page_size, [Org.created_at.desc()])
+        return paginate(actor.session, stmt, pagination,
+                        [Org.created_at.desc()], Org.id)
 
     @staticmethod
     def get_org_detail(actor: Actor, org_uuid: str) -> dict | None:
@@ -106,13 +222,133 @@ class OrgAPI:
         """获取组织用户信息"""
 
         stmt = select(
+            OrgUser.user_uuid,
+            User.account,
             OrgUser.org_user_name,
-            OrgUser.org_user_status
-        ).where(
-            OrgUser.org_uuid == org_uuid
-        )
+            OrgUser.org_user_status,
+            OrgUser.created_at
+        ).join_from(
+            OrgUser, User, OrgUser.user_uuid == User.user_uuid
+        ).where(and_(
+            OrgUser.org_uuid == org_uuid,
+            User.is_deleted == False
+        ))
+
+        return paginate(actor.session, stmt, pagination,
+                        [OrgUser.created_at.desc()], OrgUser.id)
 
-        return
+    @staticmethod
+    def add_members(actor: Actor, data: OrgMemberAdd) -> tuple[ErrInfo, list[dict]]:
+        """批量添加组织用户,已是成员的用户更新组织内状态;可同时分配角色;组织所有者不可修改
+
+        每批用户一次IN查询校验账号,按uni_org_user以及uni_org_user_role批量upsert
+        """
+        session = actor.session
+        err, org = check_member_org(actor, data.org_uuid, data.user_uuids)
+        if org is None:
+            return err, []
+        if data.role_ids and not check_roles_available(session, data.org_uuid, data.role_ids):
+            return APIErrors.ORG_MEMBER_ROLE_NOT_AVAIABLE, []
+
+        results = []
+        for chunk in member_chunks(data.user_uuids):
+            stmt = select(User.user_uuid, User.nick_name).where(and_(
+                User.is_deleted == False,
+                User.user_uuid.in_(chunk)
+            ))
+            users = {row["user_uuid"]: row["nick_name"] for row in ORM.all(session, stmt)
+                     if row["user_uuid"] != org["owner_uuid"]}
+
+            chunk_results = [member_result(user_uuid,
+                                           APIErrors.ORG_MEMBER_OWNER_CTRL_DINED if user_uuid == org["owner_uuid"]
+                                           else APIErrors.NO_ERROR if user_uuid in users
+                                           else APIErrors.ORG_MEMBER_USER_NOT_AVAIABLE)
+                             for user_uuid in chunk]
+            members = [dict(org_uuid=data.org_uuid,
+                            user_uuid=user_uuid,
+                            org_user_name=nick_name,
+                            org_user_status=data.org_user_status)
+                       for user_uuid, nick_name in users.items()]
+
+            results.extend(write_member_chunk(session, chunk_results, [
+                partial(upsert, session, OrgUser, MEMBER_KEYS, members, ["org_user_status"]),
+                partial(upsert, session, OrgUserRole, MEMBER_ROLE_KEYS,
+                        role_rows(data.org_uuid, list(users), data.role_ids)),
+            ]))
+            invalidate_org_user_profile(data.org_uuid, list(users))
+
+        invalidate_counts(OrgUser.__tablename__, OrgUserRole.__tablename__)
+        invalidate_permission(data.org_uuid)
+        return APIErrors.NO_ERROR, results
+
+    @staticmethod
+    def remove_members(actor: Actor, data: OrgMemberRemove) -> tuple[ErrInfo, list[dict]]:
+        """批量移出组织用户,同时删除用户在该组织内的角色;组织所有者不可移出"""
+        session = actor.session
+        err, org = check_member_org(actor, data.org_uuid, data.user_uuids)
+        if org is None:
+            return err, []
+
+        results = []
+        for chunk in member_chunks(data.user_uuids):
+            members = get_org_members(session, data.org_uuid, chunk) - {org["owner_uuid"]}
+
+            chunk_results = [member_result(user_uuid,
+                                           APIErrors.ORG_MEMBER_OWNER_REMOVE_DINED if user_uuid == org["owner_uuid"]
+                                           else APIErrors.NO_ERROR if user_uuid in members
+                                           else APIErrors.ORG_MEMBER_NOT_IN_ORG)
+                             for user_uuid in chunk]
+            if not members:
+                results.extend(chunk_results)
+                continue
+
+            results.extend(write_member_chunk(session, chunk_results, [
+                partial(session.execute, delete(OrgUserRole).where(and_(OrgUserRole.org_uuid == data.org_uuid,
+                                                                        OrgUserRole.user_uuid.in_(members)))),
+                partial(session.execute, delete(OrgUser).where(and_(OrgUser.org_uuid == data.org_uuid,
+                                                                    OrgUser.user_uuid.in_(members)))),
+            ]))
+            invalidate_org_user_profile(data.org_uuid, list(members))
+
+        invalidate_counts(OrgUser.__tablename__, OrgUserRole.__tablename__)
+        invalidate_permission(data.org_uuid)
+        return APIErrors.NO_ERROR, results
+
+    @staticmethod
+    def assign_member_roles(actor: Actor, data: OrgMemberRole) -> tuple[ErrInfo, list[dict]]:
+        """批量为组织用户分配角色,replace为True时移除用户在该组织内的其他角色"""
+        session = actor.session
+        err, org = check_member_org(actor, data.org_uuid, data.user_uuids)
+        if org is None:
+            return err, []
+        if not check_roles_available(session, data.org_uuid, data.role_ids):
+            return APIErrors.ORG_MEMBER_ROLE_NOT_AVAIABLE, []
+
+        results = []
+        for chunk in member_chunks(data.user_uuids):
+            members = get_org_members(session, data.org_uuid, chunk)
+
+            chunk_results = [member_result(user_uuid, APIErrors.NO_ERROR if user_uuid in members
+                                           else APIErrors.ORG_MEMBER_NOT_IN_ORG)
+                             for user_uuid in chunk]
+            if not members:
+                results.extend(chunk_results)
+                continue
+
+            writes = [partial(upsert, session, OrgUserRole, MEMBER_ROLE_KEYS,
+                              role_rows(data.org_uuid, list(members), data.role_ids))]
+            if data.replace:
+                writes.insert(0, partial(session.execute, delete(OrgUserRole).where(and_(
+                    OrgUserRole.org_uuid == data.org_uuid,
+                    OrgUserRole.user_uuid.in_(members),
+                    OrgUserRole.role_id.not_in(data.role_ids)
+                ))))
+
+            results.extend(write_member_chunk(session, chunk_results, writes))
+
+        invalidate_counts(OrgUserRole.__tablename__)
+        invalidate_permission(data.org_uuid)
+        return APIErrors.NO_ERROR, results
 
     @staticmethod
     def create_org(actor: Actor, data: OrgCreate) -> APIErrors:
@@ -139,6 +375,7 @@ class OrgAPI:
 
             session.add_all([org, org_user])
             session.commit()
+            invalidate_counts(Org.__tablename__, OrgUser.__tablename__)
         except Exception as e:
             session.rollback()
             raise e
@@ -191,6 +428,8 @@ class OrgAPI:
             session.execute(stmt)
 
             session.commit()
+            invalidate_counts(Org.__tablename__)
+            invalidate_org_profile(data.org_uuid)
         except Exception as e:
             session.rollback()
             raise e
@@ -203,7 +442,7 @@ class OrgAPI:
             session = actor.session
             deleted_uuid = data.org_uuid
 
-            if OrgAPI.check_admin_org(session, deleted_uuid) == True:
+            if check_admin_org(session, deleted_uuid) == True:
                 return APIErrors.ORG_ADMIN_CTRL_DINED
 
             # 组织逻辑删除(组织用户信息保留)
@@ -214,6 +453,8 @@ class OrgAPI:
 
             session.execute(stmt)
             session.commit()
+            invalidate_counts(Org.__tablename__)
+            invalidate_org_profile(deleted_uuid)
         except Exception as e:
             session.rollback()
             raise e
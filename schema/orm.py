@@ -0,0 +1,331 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from math import ceil
+from sqlalchemy import and_, or_, func, bindparam, insert, select, text, update as sa_update, Insert, Select, Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from sqlalchemy.sql.util import find_tables
+from jhu.orm import ORM, ORMFormatRule, format_filed
+from api.config.cache import TTLCache
+from api.config.settings import settings
+from .base import Pagination
+
+# 分页总数缓存,key为(涉及的表名,SQL,参数)
+count_cache = TTLCache(max_size=settings.count_cache_size, ttl=settings.count_cache_ttl_seconds)
+
+
+def cached_counts(session: Session, stmt: Select) -> int:
+    """获取数据量,相同的查询条件在有效期内直接返回缓存结果"""
+    compiled = stmt.compile()
+    tables = frozenset(table.name for table in find_tables(stmt, include_joins=True))
+    key = (tables, str(compiled), repr(sorted(compiled.params.items())))
+
+    if (total := count_cache.get(key)) is None:
+        total = ORM.counts(session, stmt)
+        count_cache.set(key, total)
+    return total
+
+
+def invalidate_counts(*tables: str) -> int:
+    """数据变更后失效涉及这些表的总数缓存,返回失效的条目数"""
+    names = set(tables)
+    return count_cache.pop_if(lambda key: not names.isdisjoint(key[0]))
+
+
+def estimated_counts(session: Session, table: Table) -> int | None:
+    """根据数据库的表统计信息估算数据量,不支持的数据库返回None"""
+    match session.get_bind().dialect.name:
+        case "mysql":
+            stmt = text("SELECT table_rows FROM information_schema.tables "
+                        "WHERE table_schema = DATABASE() AND table_name = :name")
+        case "postgresql":
+            stmt = text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name")
+        case _:
+            return None
+
+    total = session.scalar(stmt, {"name": table.name})
+    return None if total is None else max(int(total), 0)
+
+
+def _counts(session: Session, stmt: Select, pagination: Pagination, table: Table | None) -> int:
+    """分页总数:查询不带WHERE条件且请求估算时使用表统计信息,否则使用缓存的精确总数
+
+    表统计信息包含所有行(含逻辑删除的行),带任何过滤条件时估算值都会偏大
+    """
+    if pagination.estimate_total and table is not None and stmt.whereclause is None:
+        # 统计信息为0时可能尚未收集(如PostgreSQL新建的表),使用精确总数,避免跳过数据查询
+        if total := estimated_counts(session, table):
+            return total
+    return cached_counts(session, stmt)
+
+
+def offset_pagination(session: Session, stmt: Select, total: int, page_idx: int = 1, page_size: int = 10,
+                      order: list = None, format_rules: list[ORMFormatRule] = []) -> dict:
+    """页码分页查询数据,返回结构与ORM.pagination一致;总数由调用方提供"""
+    if page_size < 1:
+        page_size = 1
+
+    if page_idx > 0:
+        offset = (page_idx - 1) * page_size
+    else:
+        offset = 0
+        page_idx = 1
+
+    pagination = dict(page_idx=page_idx, page_size=page_size,
+                      page_total=ceil(total / page_size), total=total)
+
+    data = dict(records=[], pagination=pagination)
+
+    # 如果总数为零,不需要继续执行查询
+    if total == 0:
+        return data
+
+    if order is not None:
+        stmt = stmt.order_by(*order)
+
+    stmt = stmt.offset(offset).limit(page_size)
+    data["records"] = ORM.all(session, stmt, format_rules)
+
+    return data
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解码,或与接口的排序字段数量不一致"""
+
+
+def encode_cursor(values: list) -> str:
+    """编码分页游标,datetime以ISO格式保存"""
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$dt": value.isoformat()}
+        raise TypeError(f"unsupported cursor value: {value!r}")
+
+    raw = json.dumps(values, default=default, separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """解码分页游标,游标无效时抛出InvalidCursor"""
+    def object_hook(obj):
+        return datetime.fromisoformat(obj["$dt"]) if "$dt" in obj else obj
+
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw, object_hook=object_hook)
+    except Exception:
+        raise InvalidCursor("无效的分页游标")
+
+    if not isinstance(values, list):
+        raise InvalidCursor("无效的分页游标")
+    return values
+
+
+def _order_keys(order: list | None, id_column) -> list[tuple]:
+    """将排序条件拆解为(列,是否倒序),并以ID列作为唯一的排序兜底"""
+    keys = []
+    for expression in order or []:
+        if isinstance(expression, UnaryExpression) and expression.modifier in (operators.desc_op, operators.asc_op):
+            keys.append((expression.element, expression.modifier is operators.desc_op))
+        else:
+            keys.append((expression, False))
+
+    keys.append((id_column, keys[0][1] if keys else False))
+    return keys
+
+
+def cursor_pagination(session: Session, stmt: Select, id_column, cursor: str = "", page_size: int = 10,
+                      order: list = None, format_rules: list[ORMFormatRule] = [], total: int | None = None) -> dict:
+    """游标(keyset)分页查询数据;按排序列以及ID定位下一页,不再使用OFFSET,深分页与首页代价相同
+
+    Args:
+        id_column: 唯一列(通常为主键),作为排序兜底并写入游标
+        cursor: 上一页返回的next_cursor,空字符串表示首页
+        total: 总数,None表示不返回总数
+    """
+    if page_size < 1:
+        page_size = 1
+
+    keys = _order_keys(order, id_column)
+
+    pagination = dict(page_size=page_size)
+    if total is not None:
+        pagination["total"] = total
+
+    # 定位到游标之后的数据:(k1 > v1) or (k1 = v1 and k2 > v2) or ...
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise InvalidCursor("无效的分页游标")
+
+        conditions = []
+        for i, (column, descending) in enumerate(keys):
+            equals = [keys[j][0] == values[j] for j in range(i)]
+            after = column < values[i] if descending else column > values[i]
+            conditions.append(and_(*equals, after))
+        stmt = stmt.where(or_(*conditions))
+
+    labels = [f"_cursor_{i}" for i in range(len(keys))]
+    stmt = stmt.add_columns(*[column.label(label) for (column, _), label in zip(keys, labels)])
+    stmt = stmt.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+    stmt = stmt.limit(page_size + 1)
+
+    records = ORM.all(session, stmt, format_rules)
+
+    next_cursor = None
+    if len(records) > page_size:
+        records = records[:page_size]
+        next_cursor = encode_cursor([records[-1][label] for label in labels])
+
+    for record in records:
+        for label in labels:
+            del record[label]
+
+    return dict(records=records, pagination=pagination, next_cursor=next_cursor)
+
+
+def paginate(session: Session, stmt: Select, pagination: Pagination, order: list = None,
+             id_column=None, format_rules: list[ORMFormatRule] = [], table: Table | None = None) -> dict:
+    """分页查询数据;请求带游标时使用游标分页,否则使用页码分页
+
+    Args:
+        id_column: 唯一列,用于游标分页
+        table: 查询的表,查询不带WHERE条件时允许按表统计信息估算总数
+    """
+    if pagination.cursor is not None and id_column is not None:
+        total = _counts(session, stmt, pagination, table) if pagination.with_total else None
+        return cursor_pagination(session, stmt, id_column, pagination.cursor, pagination.page_size,
+                                 order, format_rules, total)
+
+    total = _counts(session, stmt, pagination, table)
+    return offset_pagination(session, stmt, total, pagination.page_idx, pagination.page_size, order, format_rules)
+
+
+def sort_rows(rows: list[dict], keys: list[tuple[str, bool]]) -> list[dict]:
+    """按(字段,是否倒序)排序内存中的数据"""
+    for key, descending in reversed(keys):
+        rows = sorted(rows, key=lambda row: row[key], reverse=descending)
+    return rows
+
+
+def _row_after(row: dict, keys: list[tuple[str, bool]], values: list) -> bool:
+    for (key, descending), value in zip(keys, values):
+        if row[key] != value:
+            return row[key] < value if descending else row[key] > value
+    return False
+
+
+def paginate_rows(rows: list[dict], pagination: Pagination, order: list[tuple[str, bool]], id_key: str = "id",
+                  columns: list[str] = None, format_rules: list[ORMFormatRule] = []) -> dict:
+    """对内存中的数据分页,返回结构以及游标格式与paginate一致
+
+    Args:
+        rows: 已按order以及id_key排序的数据,见sort_rows
+        order: 排序字段以及是否倒序,id_key作为兜底,方向与第一个字段相同
+        columns: 返回的字段,None表示全部
+    """
+    keys = [*order, (id_key, order[0][1] if order else False)]
+    page_size = max(pagination.page_size, 1)
+
+    def output(row: dict) -> dict:
+        return format_filed({k: row[k] for k in columns} if columns else dict(row), format_rules)
+
+    if pagination.cursor is None:
+        page_idx = pagination.page_idx if pagination.page_idx > 0 else 1
+        offset = (page_idx - 1) * page_size
+        return dict(records=[output(row) for row in rows[offset:offset + page_size]],
+                    pagination=dict(page_idx=page_idx, page_size=page_size,
+                                    page_total=ceil(len(rows) / page_size), total=len(rows)))
+
+    start = 0
+    if pagination.cursor:
+        values = decode_cursor(pagination.cursor)
+        if len(values) != len(keys):
+            raise InvalidCursor("无效的分页游标")
+        start = next((i for i, row in enumerate(rows) if _row_after(row, keys, values)), len(rows))
+
+    page = rows[start:start + page_size + 1]
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor([page[-1][key] for key, _ in keys])
+
+    result = dict(page_size=page_size)
+    if pagination.with_total:
+        result["total"] = len(rows)
+    return dict(records=[output(row) for row in page], pagination=result, next_cursor=next_cursor)
+
+
+def upsert_stmt(session: Session, model, keys: list[str], update: list[str] = None) -> Insert | None:
+    """按唯一键写入的INSERT语句,唯一键冲突时更新update中的列,update为空时忽略冲突的行
+
+    MySQL使用ON DUPLICATE KEY UPDATE,PostgreSQL以及SQLite使用ON CONFLICT;
+    其他数据库不支持时返回None,由upsert改为先查询再写入
+
+    Args:
+        keys: 唯一约束的列,ON CONFLICT需要
+        update: 冲突时更新的列,值取自本次写入的数据
+    """
+    table = model.__table__
+    match session.get_bind().dialect.name:
+        case "mysql" | "mariadb":
+            stmt = mysql.insert(table)
+            # 没有需要更新的列时将唯一键更新为自身,即忽略冲突
+            values = ({name: stmt.inserted[name] for name in update} if update
+                      else {keys[0]: table.c[keys[0]]})
+            if update:
+                values["updated_at"] = func.now()
+            return stmt.on_duplicate_key_update(values)
+        case "postgresql" | "sqlite" as dialect:
+            stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+            if not update:
+                return stmt.on_conflict_do_nothing(index_elements=keys)
+            return stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={**{name: stmt.excluded[name] for name in update}, "updated_at": func.now()})
+        case _:
+            return None
+
+
+def upsert(session: Session, model, keys: list[str], rows: list[dict], update: list[str] = None) -> None:
+    """按唯一键批量写入,唯一键冲突时更新update中的列,update为空时忽略冲突的行;不提交事务
+
+    数据库支持时使用upsert_stmt一次写入,否则先一次查询已存在的唯一键,再分别批量INSERT以及UPDATE;
+    查询与写入之间其他事务写入了相同的唯一键时抛出IntegrityError,由调用方回滚
+
+    Args:
+        keys: 唯一约束的列,每行均需包含
+        rows: 写入的数据
+        update: 冲突时更新的列,值取自本次写入的数据
+    """
+    if not rows:
+        return
+
+    if (stmt := upsert_stmt(session, model, keys, update)) is not None:
+        session.execute(stmt, rows)
+        return
+
+    table = model.__table__
+    stmt = select(*[table.c[key] for key in keys]).where(and_(
+        *[table.c[key].in_({row[key] for row in rows}) for key in keys]
+    ))
+    existing = {tuple(row) for row in session.execute(stmt)}
+
+    # 相同唯一键的行以最后一行为准
+    inserts, updates = {}, {}
+    for row in rows:
+        key = tuple(row[name] for name in keys)
+        (updates if key in existing else inserts)[key] = row
+
+    if inserts:
+        session.execute(insert(table), list(inserts.values()))
+
+    if update and updates:
+        stmt = sa_update(table).where(and_(
+            *[table.c[key] == bindparam(f"_key_{key}") for key in keys]
+        )).values({**{name: bindparam(f"_value_{name}") for name in update}, "updated_at": func.now()})
+        session.execute(stmt, [{**{f"_key_{key}": row[key] for key in keys},
+                                **{f"_value_{name}": row[name] for name in update}}
+                               for row in updates.values()])
@@ -0,0 +1,103 @@
+from threading import Lock
+from time import time
+from sqlalchemy import select, and_, or_
+from sqlalchemy.orm import Session
+from jhu.orm import ORM
+from api.model.app import AppRole, AppService
+from api.model.org import OrgUser, OrgUserRole, OrgUserStatus
+from api.model.role import Role, RoleStatus
+from api.config.settings import settings
+from .base import Permission
+from .profile import cache_bus
+
+
+class PermissionIndex:
+    """组织用户权限索引
+
+    按组织一次性编译 (org_uuid, user_uuid) -> 服务标识集合以及数据权限,
+    请求鉴权时仅做内存中的集合判断;角色或授权变更时调用invalidate_permission失效
+
+    Args:
+        ttl: 组织索引的最长缓存时间(秒),用于兜底未广播到的变更
+    """
+
+    def __init__(self, ttl: float = 300) -> None:
+        self.ttl = ttl
+        self._orgs: dict[str, tuple[float, dict[str, Permission]]] = {}
+        self._lock = Lock()
+        # 每次失效时递增,加载期间发生过失效的结果不保存
+        self._generation = 0
+
+    def get(self, org_uuid: str, user_uuid: str) -> Permission | None:
+        """获取组织用户的权限;组织索引未加载或已过期时返回None"""
+        item = self._orgs.get(org_uuid)
+        if item is None or item[0] < time():
+            return None
+        return item[1].get(user_uuid, EMPTY_PERMISSION)
+
+    def load(self, session: Session, org_uuid: str) -> dict[str, Permission]:
+        """从数据库编译组织的权限索引;停用的组织用户不授予任何权限"""
+        generation = self._generation
+        stmt = select(
+            OrgUserRole.user_uuid,
+            AppService.service_tag,
+            AppRole.data_scope_dept,
+            AppRole.data_scope_region
+        ).join_from(
+            OrgUserRole, OrgUser, and_(OrgUser.org_uuid == OrgUserRole.org_uuid,
+                                       OrgUser.user_uuid == OrgUserRole.user_uuid)
+        ).join(
+            Role, OrgUserRole.role_id == Role.id
+        ).join(
+            AppRole, and_(AppRole.role_id == Role.id,
+                          or_(AppRole.org_uuid == OrgUserRole.org_uuid,
+                              AppRole.org_uuid == Role.org_uuid))
+        ).join(
+            AppService, AppService.id == AppRole.app_service_id
+        ).where(and_(
+            OrgUserRole.org_uuid == org_uuid,
+            OrgUser.org_user_status == OrgUserStatus.ENABLE.value,
+            Role.is_deleted == False,
+            Role.role_status == RoleStatus.ENABLE.value
+        ))
+
+        # 同一服务被多个角色授权时,数据权限取最大范围
+        users: dict[str, dict[str, tuple[int, int]]] = {}
+        for row in ORM.all(session, stmt):
+            data_scopes = users.setdefault(row["user_uuid"], {})
+            dept, region = data_scopes.get(row["service_tag"], (row["data_scope_dept"], row["data_scope_region"]))
+            data_scopes[row["service_tag"]] = (max(dept, row["data_scope_dept"]),
+                                               max(region, row["data_scope_region"]))
+
+        index = {user_uuid: Permission(scopes=frozenset(data_scopes), data_scopes=data_scopes)
+                 for user_uuid, data_scopes in users.items()}
+
+        with self._lock:
+            # 加载期间收到失效通知时,结果可能早于变更,只用于本次请求
+            if generation == self._generation:
+                self._orgs[org_uuid] = (time() + self.ttl, index)
+        return index
+
+    def invalidate(self, org_uuid: str | None = None) -> None:
+        """失效组织的权限索引,org_uuid为None时失效全部"""
+        with self._lock:
+            self._generation += 1
+            if org_uuid is None:
+                self._orgs.clear()
+            else:
+                self._orgs.pop(org_uuid, None)
+
+    def stats(self) -> dict:
+        return dict(orgs=len(self._orgs),
+                    users=sum(len(index) for _, index in self._orgs.values()))
+
+
+EMPTY_PERMISSION = Permission()
+
+permission_index = PermissionIndex(ttl=settings.permission_ttl_seconds)
+cache_bus.subscribe("permission", permission_index.invalidate)
+
+
+def invalidate_permission(org_uuid: str) -> None:
+    """组织用户的角色或成员状态变更后调用,同时广播给其他worker"""
+    cache_bus.publish("permission", org_uuid)
@@ -0,0 +1,72 @@
+from threading import Lock
+from typing import Any, Hashable
+from api.config.bus import InvalidationBus, new_broker
+from api.config.cache import TTLCache
+from api.config.settings import settings
+
+# 缓存未命中的标记,查询结果为None时同样缓存
+MISSING = object()
+
+
+class ProfileCache:
+    """组织以及组织用户资料缓存,用于每次页面加载都会请求的/auth/org_user以及/auth/org_name
+
+    读取数据库前取得版本号,写入时若期间发生过失效则丢弃,避免失效前读出的旧数据被写回缓存
+
+    Args:
+        max_size: 每个缓存的最大条目数
+        ttl: 有效期(秒),用于兜底未广播到的变更
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300) -> None:
+        # org_uuid -> 组织名称
+        self.org_names = TTLCache(max_size=max_size, ttl=ttl)
+        # (org_uuid, user_uuid) -> 组织用户信息
+        self.org_users = TTLCache(max_size=max_size, ttl=ttl)
+        self.version = 0
+        self._lock = Lock()
+
+    def get(self, cache: TTLCache, key: Hashable) -> tuple[Any, int]:
+        """返回缓存值以及当前版本号,未命中时缓存值为MISSING"""
+        return cache.get(key, MISSING), self.version
+
+    def set(self, cache: TTLCache, key: Hashable, value: Any, version: int) -> None:
+        with self._lock:
+            if version == self.version:
+                cache.set(key, value)
+
+    def invalidate_org(self, org_uuid: str) -> None:
+        """失效组织名称以及该组织下所有用户的信息"""
+        with self._lock:
+            self.version += 1
+            self.org_names.pop(org_uuid)
+            self.org_users.pop_if(lambda key: key[0] == org_uuid)
+
+    def invalidate_org_users(self, org_uuid: str, user_uuids: list[str]) -> None:
+        with self._lock:
+            self.version += 1
+            for user_uuid in user_uuids:
+                self.org_users.pop((org_uuid, user_uuid))
+
+    def stats(self) -> dict:
+        return dict(org_names=self.org_names.stats(),
+                    org_users=self.org_users.stats(),
+                    version=self.version)
+
+
+profile_cache = ProfileCache(max_size=settings.profile_cache_size, ttl=settings.profile_cache_ttl_seconds)
+
+# 跨worker的缓存失效广播,在应用启动时开始
+cache_bus = InvalidationBus(new_broker(settings.cache_bus_url, settings.cache_bus_channel))
+cache_bus.subscribe("org", profile_cache.invalidate_org)
+cache_bus.subscribe("org_users", profile_cache.invalidate_org_users)
+
+
+def invalidate_org_profile(org_uuid: str) -> None:
+    """组织信息或成员变更后调用,同时广播给其他worker"""
+    cache_bus.publish("org", org_uuid)
+
+
+def invalidate_org_user_profile(org_uuid: str, user_uuids: list[str]) -> None:
+    """组织用户信息变更后调用,同时广播给其他worker"""
+    cache_bus.publish("org_users", org_uuid, user_uuids)
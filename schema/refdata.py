@@ -0,0 +1,188 @@
+import re
+from hashlib import blake2b
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from threading import Lock
+from time import time
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from api.config.fastjson import dumps
+from api.config.settings import settings
+from api.model.app import App, AppService
+from api.model.role import Role
+from .orm import sort_rows
+from .profile import cache_bus
+
+# 各表在快照中的排序,与原有列表接口的ORDER BY一致
+ROLE_ORDER = [("created_at", True)]
+APP_ORDER = [("updated_at", True)]
+SERVICE_ORDER = [("service_tag", False)]
+
+
+@lru_cache(maxsize=256)
+def like_pattern(pattern: str) -> re.Pattern:
+    """将LIKE模式(%以及_通配符)转换为不区分大小写的正则,与ilike的匹配结果一致"""
+    regex = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def ilike(value: str, pattern: str) -> bool:
+    return like_pattern(pattern).fullmatch(value) is not None
+
+
+@dataclass(frozen=True)
+class RefData:
+    """参考数据快照:系统默认角色、应用以及应用服务,加载后只读"""
+    version: int = 0
+    # 表指纹(数据量,最大ID,最近更新时间),用于判断数据是否变化
+    fingerprint: tuple = ()
+    # 快照内容的摘要,内容相同时各worker一致,用于ETag;直接修改数据库未更新updated_at时指纹不变,摘要仍会变化
+    digest: str = ""
+    roles: list[dict] = field(default_factory=list)
+    role_by_id: dict[int, dict] = field(default_factory=dict)
+    apps: list[dict] = field(default_factory=list)
+    services: dict[int, list[dict]] = field(default_factory=dict)
+
+
+def fetch_rows(session: Session, stmt) -> list[dict]:
+    return [dict(row) for row in session.execute(stmt).mappings()]
+
+
+def refdata_fingerprint(session: Session) -> tuple:
+    """快照涉及的表的指纹,每张表一次聚合查询"""
+    return tuple(
+        tuple(session.execute(select(func.count(), func.max(model.id), func.max(model.updated_at))).one())
+        for model in (Role, App, AppService)
+    )
+
+
+class RefDataCache:
+    """参考数据的进程内快照
+
+    列表、过滤以及分页均在内存中完成;快照过期后先比较表指纹,未变化时直接延长有效期,
+    变化或收到失效通知时重新加载并递增版本号
+
+    查询数据库期间不持有锁:异步模式下load经AsyncSession.run_sync在事件循环线程中执行,
+    持锁等待IO时其他请求获取同一把锁会阻塞事件循环;并发的请求可能重复查询,只在替换快照时加锁
+
+    Args:
+        ttl: 快照有效期(秒),过期后的第一个请求检查表指纹
+    """
+
+    def __init__(self, ttl: float = 60) -> None:
+        self.ttl = ttl
+        self._data: RefData | None = None
+        self._expire_at = 0.0
+        self._lock = Lock()
+        # 每次失效时递增,加载期间发生过失效的结果不保存
+        self._generation = 0
+        self.loads = 0
+        self.checks = 0
+
+    def get(self) -> RefData | None:
+        """获取快照;未加载、已过期或已失效时返回None"""
+        if self._data is None or self._expire_at < time():
+            return None
+        return self._data
+
+    def load(self, session: Session) -> RefData:
+        """检查表指纹,变化时从数据库重新加载快照"""
+        if (data := self.get()) is not None:
+            return data
+
+        with self._lock:
+            current, generation = self._data, self._generation
+
+        fingerprint = refdata_fingerprint(session)
+        if current is not None and current.fingerprint == fingerprint:
+            data = current
+        else:
+            data = self._load(session, fingerprint)
+
+        with self._lock:
+            self.checks += 1
+            if data is not current:
+                self.loads += 1
+
+            # 加载期间收到失效通知时,结果可能早于变更,只用于本次请求
+            if generation != self._generation:
+                return data
+
+            if self._data is not None and self._data.fingerprint == fingerprint:
+                # 数据未变化,或已由并发的请求加载,保持版本号不变
+                data = self._data
+            else:
+                data = replace(data, version=(self._data.version if self._data is not None else 0) + 1)
+                self._data = data
+            self._expire_at = time() + self.ttl
+            return data
+
+    def _load(self, session: Session, fingerprint: tuple) -> RefData:
+        stmt = select(
+            Role.id,
+            Role.role_name,
+            Role.role_remark,
+            Role.role_status,
+            Role.created_at,
+            Role.updated_at
+        ).where(
+            Role.is_deleted == False,
+            Role.org_uuid == ""
+        )
+        roles = sort_rows(fetch_rows(session, stmt), [*ROLE_ORDER, ("id", True)])
+
+        stmt = select(
+            App.id,
+            App.app_name,
+            App.app_remark,
+            App.app_status,
+            App.created_at,
+            App.updated_at
+        ).where(App.is_deleted == False)
+        apps = sort_rows(fetch_rows(session, stmt), [*APP_ORDER, ("id", True)])
+
+        stmt = select(
+            AppService.id,
+            AppService.app_id,
+            AppService.service_name,
+            AppService.service_tag
+        )
+        services: dict[int, list[dict]] = {}
+        for row in sort_rows(fetch_rows(session, stmt), [*SERVICE_ORDER, ("id", False)]):
+            services.setdefault(row["app_id"], []).append(row)
+
+        return RefData(fingerprint=fingerprint,
+                       digest=blake2b(dumps([roles, apps, services]), digest_size=16).hexdigest(),
+                       roles=roles,
+                       role_by_id={row["id"]: row for row in roles},
+                       apps=apps,
+                       services=services)
+
+    def invalidate(self) -> None:
+        """失效快照,下一个请求重新检查表指纹"""
+        with self._lock:
+            self._generation += 1
+            self._expire_at = 0.0
+            if self._data is not None:
+                # 清空指纹,确保重新加载
+                self._data = replace(self._data, fingerprint=())
+
+    def stats(self) -> dict:
+        data = self._data
+        return dict(version=data.version if data else 0,
+                    digest=data.digest if data else "",
+                    fresh=self.get() is not None,
+                    roles=len(data.roles) if data else 0,
+                    apps=len(data.apps) if data else 0,
+                    services=sum(len(v) for v in data.services.values()) if data else 0,
+                    loads=self.loads,
+                    checks=self.checks)
+
+
+refdata = RefDataCache(ttl=settings.refdata_ttl_seconds)
+cache_bus.subscribe("refdata", refdata.invalidate)
+
+
+def invalidate_refdata() -> None:
+    """角色、应用或应用服务变更后调用,同时广播给其他worker"""
+    cache_bus.publish("refdata")
@@ -1,12 +1,14 @@
 from pydantic import BaseModel, Field, field_validator
-from sqlalchemy import select, update, delete, and_
+from sqlalchemy import select, insert, update, delete, and_, or_, func
 from jhu.orm import ORM, ORMFormatRule, ORMCheckRule
 from api.config.settings import settings
-from api.config.security import phone_decrypy, phone_encrypt, generate_uuid_str, hash_api
-from api.model.user import User, UserAuth, UserAuthType, UserStatus
+from api.config.security import (phone_decrypy, phone_decrypt_many, phone_encrypt, phone_encrypt_many,
+                                 phone_tokens, generate_uuid_str, hash_api)
+from api.model.user import User, UserAuth, UserAuthType, UserStatus, UserPhoneToken
 from api.model.org import Org, OrgUser
-from api.schema.errcode import APIErrors
+from api.schema.errcode import APIErrors, ErrInfo
 from .base import Actor, Pagination, Session
+from .orm import paginate, invalidate_counts
 
 
 class AccountCreate(BaseModel):
@@ -23,6 +25,10 @@ class AccountCreate(BaseModel):
         return value
 
 
+class AccountBatchCreate(BaseModel):
+    accounts: list[AccountCreate] = Field(description="账号列表")
+
+
 class AccountUpdate(BaseModel):
     user_uuid: str = Field(descrixption="用户UUID")
     nick_name: str = Field(description="用户昵称")
@@ -60,6 +66,59 @@ def check_account_unique(session: Session, phone_enc: str, account: str, user_uu
     return ORM.check(session, orm_check_rules, except_expression)
 
 
+def phone_search_expression(phone: str):
+    """手机号模糊查询条件
+
+    先通过分段盲索引(t_user_phone_token)定位包含所有分段的候选用户,
+    再对候选用户校验密文的分段顺序;不足3位时无法构成分段,仍按密文匹配
+    """
+    phone_enc = phone_encrypt(phone)
+    if len(phone) < 3:
+        return User.phone_enc.ilike(f"%{phone_enc}%")
+
+    tokens = phone_tokens(phone)
+    candidates = select(
+        UserPhoneToken.user_uuid
+    ).where(
+        UserPhoneToken.token_hash.in_(tokens)
+    ).group_by(
+        UserPhoneToken.user_uuid
+    ).having(func.count() == len(tokens))
+
+    return and_(User.user_uuid.in_(candidates),
+                User.phone_enc.ilike(f"%{phone_enc}%"))
+
+
+def build_phone_tokens(user_uuid: str, phone: str) -> list[UserPhoneToken]:
+    """构建用户手机号的分段索引"""
+    return [UserPhoneToken(token_hash=token, user_uuid=user_uuid) for token in phone_tokens(phone)]
+
+
+def decrypt_phone_records(records: list[dict]) -> list[dict]:
+    """批量解密分页数据中的手机号"""
+    phones = phone_decrypt_many([record["phone"] for record in records])
+    for record, phone in zip(records, phones):
+        record["phone"] = phone
+    return records
+
+
+def batch_row_result(index: int, account: str, err: ErrInfo, user_uuid: str = "", message: str = "") -> dict:
+    """批量导入的单行结果"""
+    return dict(index=index, account=account, user_uuid=user_uuid,
+                code=err.code, message=message or err.message)
+
+
+def check_accounts_unique(session: Session, accounts: list[str], phone_encs: list[str]) -> tuple[set, set]:
+    """批量账号唯一性判断,一次IN查询返回已存在的账号以及手机号密文"""
+    phone_encs = [v for v in phone_encs if v]
+    expression = User.account.in_(accounts)
+    if phone_encs:
+        expression = or_(expression, User.phone_enc.in_(phone_encs))
+
+    rows = ORM.all(session, select(User.account, User.phone_enc).where(expression))
+    return {row["account"] for row in rows}, {row["phone_enc"] for row in rows}
+
+
 def check_superadmin(session: Session, user_uuid: str) -> bool:
     """判断是否是超级管理员"""
     stmt = select(Org.id).where(and_(Org.is_deleted == False,
@@ -94,15 +153,15 @@ class UserAPI:
                          ) -> list:
         """获取账户list"""
 
-        # 加密手机号
-        phone_enc = phone_encrypt(phone) if phone else ""
+        # 手机号查询条件
+        phone_expression = phone_search_expression(phone) if phone else None
 
         # 拼接查询条件
         expressions = [expression for condtion,
                        expression in [
                            (account, User.account.ilike(f"%{account}%")),
                            (nick_name, User.nick_name.ilike(f"%{nick_name}%")),
-                           (phone_enc, User.phone_enc.ilike(f"%{phone_enc}%")),
+                           (phone, phone_expression),
                            (status is not None, User.user_status == status),
                        ] if condtion]
 
@@ -119,7 +178,10 @@ class UserAPI:
             *expressions
         ))
 
-        return ORM.pagination(actor.session, stmt, pagination.page_idx, pagination.page_size, [User.created_at.desc()], format_rules)
+        data = paginate(actor.session, stmt, pagination,
+                        [User.created_at.desc()], User.id)
+        decrypt_phone_records(data["records"])
+        return data
 
     @staticmethod
     def get_account_detail(actor: Actor,
@@ -157,13 +219,18 @@ class UserAPI:
             OrgUser.user_uuid == user_uuid
         ))
 
-        return ORM.pagination(actor.session, stmt, page_idx=pagination.page_idx, page_size=pagination.page_size)
+        return paginate(actor.session, stmt, pagination, id_column=OrgUser.id)
 
     @staticmethod
     def create_account(data: AccountCreate,
-                       actor: Actor
+                       actor: Actor,
+                       auth_value: str = None
                        ) -> APIErrors:
-        """创建用户账号,所有需要加密存储的自动该函数会实施,入参无需处理"""
+        """创建用户账号,所有需要加密存储的自动该函数会实施,入参无需处理
+
+        Args:
+            auth_value: 默认密码的哈希值;为空时在当前线程计算
+        """
         try:
             session = actor.session
             phone_enc = phone_encrypt(data.phone)
@@ -182,17 +249,79 @@ class UserAPI:
                 user_uuid=user_uuid,
                 auth_type=UserAuthType.PASSWORD.value,
                 auth_identify="",
-                auth_value=hash_api.hash(settings.default_passwd)
+                auth_value=auth_value or hash_api.hash(settings.default_passwd)
             )
 
-            session.add_all([user, user_auth])
+            session.add_all([user, user_auth, *build_phone_tokens(user_uuid, data.phone)])
             session.commit()
+            invalidate_counts(User.__tablename__, UserPhoneToken.__tablename__)
         except Exception as e:
             session.rollback()
             raise e
 
         return APIErrors.NO_ERROR
 
+    @staticmethod
+    def create_accounts(data: list[AccountCreate],
+                        actor: Actor,
+                        auth_value: str,
+                        indexes: list[int] = None
+                        ) -> list[dict]:
+        """批量创建用户账号,在一个事务内写入;调用方按批次拆分后多次调用
+
+        Args:
+            auth_value: 默认密码的哈希值,整个导入只计算一次
+            indexes: 每行在整个导入中的序号,用于返回结果;默认从0开始
+
+        Return:
+            list[dict]: 每行的结果,见batch_row_result
+        """
+        session = actor.session
+        phone_encs = phone_encrypt_many([v.phone for v in data])
+
+        # 与已有数据以及本批次内的数据均不能重复
+        exist_accounts, exist_phones = check_accounts_unique(session, [v.account for v in data], phone_encs)
+
+        results, users, auths, tokens = [], [], [], []
+        indexes = range(len(data)) if indexes is None else indexes
+        for index, row, phone_enc in zip(indexes, data, phone_encs):
+            if row.account in exist_accounts:
+                results.append(batch_row_result(index, row.account, APIErrors.USER_ACCOUNT_ALREADY_EXISTS))
+                continue
+            if phone_enc and phone_enc in exist_phones:
+                results.append(batch_row_result(index, row.account, APIErrors.USER_PHONE_ALREADY_EXISTS))
+                continue
+
+            exist_accounts.add(row.account)
+            exist_phones.add(phone_enc)
+
+            user_uuid = generate_uuid_str()
+            users.append(dict(user_uuid=user_uuid, phone_enc=phone_enc, **row.model_dump(exclude=["phone"])))
+            auths.append(dict(user_uuid=user_uuid,
+                              auth_type=UserAuthType.PASSWORD.value,
+                              auth_identify="",
+                              auth_value=auth_value))
+            tokens.extend(dict(token_hash=token, user_uuid=user_uuid) for token in phone_tokens(row.phone))
+            results.append(batch_row_result(index, row.account, APIErrors.NO_ERROR, user_uuid))
+
+        if not users:
+            return results
+
+        try:
+            for model, rows in [(User, users), (UserAuth, auths), (UserPhoneToken, tokens)]:
+                if rows:
+                    session.execute(insert(model), rows)
+            session.commit()
+            invalidate_counts(User.__tablename__, UserPhoneToken.__tablename__)
+        except Exception as e:
+            session.rollback()
+            return [result if result["code"] != APIErrors.NO_ERROR.code
+                    else batch_row_result(result["index"], result["account"],
+                                          APIErrors.USER_BATCH_WRITE_FAILED, message=f"{e}")
+                    for result in results]
+
+        return results
+
     @staticmethod
     def update_account(data: AccountUpdate,
                        actor: Actor
@@ -213,6 +342,7 @@ class UserAPI:
 
             session.execute(stmt)
             session.commit()
+            invalidate_counts(User.__tablename__)
         except Exception as e:
             session.rollback()
             raise e
@@ -239,12 +369,53 @@ class UserAPI:
                 update(User).where(User.user_uuid == delete_uuid).values(is_deleted=True,
                                                                          account=delete_uuid,
                                                                          phone_enc=delete_uuid),
-                delete(UserAuth).where(UserAuth.user_uuid == delete_uuid)
+                delete(UserAuth).where(UserAuth.user_uuid == delete_uuid),
+                delete(UserPhoneToken).where(UserPhoneToken.user_uuid == delete_uuid)
             ]:
                 session.execute(statement)
 
             session.commit()
+            invalidate_counts(User.__tablename__, UserPhoneToken.__tablename__)
         except Exception as e:
             session.rollback()
             raise e
         return APIErrors.NO_ERROR
+
+    @staticmethod
+    def backfill_phone_tokens(session: Session, chunk_size: int = 1000) -> int:
+        """回填手机号分段索引,按ID分批处理,每批独立提交;可重复执行
+
+        Return:
+            int:处理的用户数量
+        """
+        last_id, total = 0, 0
+
+        while True:
+            stmt = select(
+                User.id,
+                User.user_uuid,
+                User.phone_enc
+            ).where(and_(
+                User.is_deleted == False,
+                User.phone_enc != "",
+                User.id > last_id
+            )).order_by(User.id).limit(chunk_size)
+
+            rows = ORM.all(session, stmt)
+            if not rows:
+                return total
+
+            try:
+                user_uuids = [row["user_uuid"] for row in rows]
+                session.execute(delete(UserPhoneToken).where(
+                    UserPhoneToken.user_uuid.in_(user_uuids)))
+                session.add_all([token for row in rows for token in build_phone_tokens(
+                    row["user_uuid"], phone_decrypy(row["phone_enc"], mask=False))])
+                session.commit()
+                invalidate_counts(UserPhoneToken.__tablename__)
+            except Exception as e:
+                session.rollback()
+                raise e
+
+            last_id = rows[-1]["id"]
+            total += len(rows)
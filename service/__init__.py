@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import auth, account, org, role, app
+from . import auth, account, org, role, app, internal, metrics
 
 router = APIRouter()
 
@@ -9,6 +9,8 @@ services_router = [
     (org.api, ["组织服务"]),
     (role.api, ["角色服务"]),
     (app.api, ["应用服务"]),
+    (internal.api, ["内部服务"]),
+    (metrics.api, ["监控服务"]),
 ]
 
 
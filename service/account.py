@@ -1,8 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
-from api.schema.user import UserAPI, AccountCreate, AccountUpdate, AccountDelete
-from .base import get_actor_info, get_pagination, get_session, Rsp
+import csv
+import json
+from typing import AsyncIterator, Iterable
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Security
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.types import Receive
+from api.config.settings import settings
+from api.config.security import hash_executor, HashPoolBusy
+from api.schema.base import Actor
+from api.schema.errcode import APIErrors
+from api.schema.user import UserAPI, AccountCreate, AccountBatchCreate, AccountUpdate, AccountDelete, batch_row_result
+from api.schema.orm import InvalidCursor
+from .base import get_actor_info, get_pagination, db_call, Rsp, RspRoute
+from .etag import etag_response
 
-api = APIRouter(prefix="/account")
+api = APIRouter(prefix="/account", route_class=RspRoute)
+
+
+class ImportStreamingResponse(StreamingResponse):
+    """边读取请求体边返回结果的流式响应
+
+    StreamingResponse默认同时调用receive监听客户端断开,会与读取请求体争抢消息;
+    这里由body_iterator独占receive,客户端断开时request.stream()抛出ClientDisconnect
+    """
+
+    async def listen_for_disconnect(self, receive: Receive) -> None:
+        await anyio.sleep_forever()
+
+
+async def iter_list(rows: Iterable[AccountCreate]) -> AsyncIterator[tuple[int, AccountCreate]]:
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+async def iter_lines(request: Request) -> AsyncIterator[str]:
+    """逐行读取请求体,不缓存整个请求"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_stream(request: Request) -> AsyncIterator[tuple[int, AccountCreate | str]]:
+    """解析CSV(首行为表头)或NDJSON格式的账号数据;格式错误的行返回错误信息"""
+    is_csv = "csv" in request.headers.get("content-type", "")
+    header = None
+    index = 0
+
+    async for line in iter_lines(request):
+        line = line.lstrip("\ufeff") if header is None else line
+        if not line.strip():
+            continue
+
+        if is_csv and header is None:
+            header = [v.strip() for v in next(csv.reader([line]))]
+            continue
+        header = header or []
+
+        try:
+            values = dict(zip(header, next(csv.reader([line])))) if is_csv else json.loads(line)
+            yield index, AccountCreate.model_validate(values)
+        except ValidationError as e:
+            yield index, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        except ValueError as e:
+            yield index, f"{e}"
+        index += 1
+
+
+async def import_chunks(rows: AsyncIterator[tuple[int, AccountCreate | str]], actor: Actor,
+                        auth_value: str) -> AsyncIterator[list[dict]]:
+    """按批次写入账号,每处理一个批次即返回这部分行按行序号排序的结果,边读取边写入
+
+    无效行的结果与同一批次的有效行一起返回,各批次依次返回,整体与输入的行序一致
+
+    Args:
+        auth_value: 默认密码的哈希值,整个导入只计算一次
+    """
+    chunk, indexes, invalid = [], [], []
+
+    async def flush() -> list[dict]:
+        results = await db_call(UserAPI.create_accounts, chunk, actor, auth_value, indexes) if chunk else []
+        results = sorted([*invalid, *results], key=lambda v: v["index"])
+        chunk.clear()
+        indexes.clear()
+        invalid.clear()
+        return results
+
+    async for index, row in rows:
+        if index >= settings.account_batch_max_rows:
+            if chunk or invalid:
+                yield await flush()
+            yield [batch_row_result(index, "", APIErrors.USER_BATCH_TOO_LARGE)]
+            break
+
+        if isinstance(row, str):
+            invalid.append(batch_row_result(index, "", APIErrors.USER_BATCH_INVALID_ROW, message=row))
+        else:
+            chunk.append(row)
+            indexes.append(index)
+
+        if len(chunk) + len(invalid) >= settings.account_batch_chunk_size:
+            yield await flush()
+
+    if chunk or invalid:
+        yield await flush()
+
+
+async def import_accounts(rows: AsyncIterator[tuple[int, AccountCreate | str]], actor: Actor) -> list[dict]:
+    """写入全部账号,默认密码只计算一次哈希;返回按行序号排序的结果"""
+    auth_value = await hash_executor.hash(settings.default_passwd)
+    results = []
+    async for chunk_results in import_chunks(rows, actor, auth_value):
+        results.extend(chunk_results)
+    return results
+
+
+async def stream_import(rows: AsyncIterator[tuple[int, AccountCreate | str]], actor: Actor,
+                        auth_value: str) -> AsyncIterator[str]:
+    """以NDJSON逐批返回导入结果,结果行与输入的行序一致,最后一行为汇总;中途出错时返回错误信息后结束"""
+    def line(value: dict) -> str:
+        return json.dumps(value, ensure_ascii=False) + "\n"
+
+    total = succeed = 0
+    try:
+        async for results in import_chunks(rows, actor, auth_value):
+            summary = summarize_results(results)
+            total += summary["total"]
+            succeed += summary["succeed"]
+            yield "".join(line(v) for v in results)
+    except Exception as e:
+        yield line(dict(error=f"{e}"))
+    yield line(dict(summary=dict(total=total, succeed=succeed, failed=total - succeed)))
+
+
+def summarize_results(results: list[dict]) -> dict:
+    succeed = sum(1 for v in results if v["code"] == APIErrors.NO_ERROR.code)
+    return dict(total=len(results), succeed=succeed, failed=len(results) - succeed)
 
 
 @api.get("/list", summary="获取账号列表信息")
@@ -14,22 +152,27 @@ async def get_list(phone: str = Query(default="", description="手机号"),
                    actor=Security(get_actor_info, scopes=["acct:list"])
                    ) -> Rsp:
     try:
-        data = UserAPI.get_account_list(
-            actor, pagination, account, nick_name, phone, status)
+        data = await db_call(UserAPI.get_account_list,
+                             actor, pagination, account, nick_name, phone, status)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(data=data)
 
 
 @api.get("/detail", summary="获取账号详细信息")
-async def get_detail(user_uuid: str = Query(description="用户UUID"),
+async def get_detail(request: Request,
+                     user_uuid: str = Query(description="用户UUID"),
                      actor=Security(get_actor_info, scopes=["acct:detail"])
                      ) -> Rsp:
     try:
-        data = UserAPI.get_account_detail(actor, user_uuid)
+        data = await db_call(UserAPI.get_account_detail, actor, user_uuid)
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=data)
+    # 按内容计算ETag,只节省传输:按user_uuid读取一行的代价与查询版本相同,
+    # updated_at只精确到秒,同一秒内的多次修改无法作为版本区分
+    return etag_response(request, Rsp(data=data))
 
 
 @api.get("/orgs", summary="获取账号组织信息")
@@ -38,7 +181,9 @@ async def get_acct_orgs(user_uuid: str = Query(description="用户UUID"),
                         actor=Security(get_actor_info, scopes=["acct:detail"])
                         ) -> Rsp:
     try:
-        data = UserAPI.get_account_orgs(actor, pagination, user_uuid)
+        data = await db_call(UserAPI.get_account_orgs, actor, pagination, user_uuid)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(data=data)
@@ -49,18 +194,55 @@ async def acct_create(data: AccountCreate,
                       actor=Security(get_actor_info, scopes=["acct:create"])
                       ) -> Rsp:
     try:
-        result = UserAPI.create_account(data, actor)
+        auth_value = await hash_executor.hash(settings.default_passwd)
+        result = await db_call(UserAPI.create_account, data, actor, auth_value)
+    except HashPoolBusy as e:
+        raise HTTPException(503, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(**result.value)
 
 
+@api.post("/batch_create", summary="批量创建账号")
+async def acct_batch_create(data: AccountBatchCreate,
+                            actor=Security(get_actor_info, scopes=["acct:create"])
+                            ) -> Rsp:
+    if len(data.accounts) > settings.account_batch_max_rows:
+        return Rsp(**APIErrors.USER_BATCH_TOO_LARGE.value)
+
+    try:
+        results = await import_accounts(iter_list(data.accounts), actor)
+    except HashPoolBusy as e:
+        raise HTTPException(503, f"{e}")
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+    return Rsp(data=dict(**summarize_results(results), results=results))
+
+
+@api.post("/batch_create/stream", summary="批量创建账号(CSV/NDJSON)",
+          description="请求体为CSV(Content-Type: text/csv,首行为表头 account,nick_name,phone,user_status)"
+                      "或NDJSON(每行一个账号的JSON);每写入一个批次即以NDJSON返回这部分行的结果,"
+                      "最后一行为汇总{\"summary\": {...}},中途出错时在汇总前返回{\"error\": ...}")
+async def acct_batch_create_stream(request: Request,
+                                   actor=Security(get_actor_info, scopes=["acct:create"])
+                                   ) -> StreamingResponse:
+    try:
+        auth_value = await hash_executor.hash(settings.default_passwd)
+    except HashPoolBusy as e:
+        raise HTTPException(503, f"{e}")
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+
+    return ImportStreamingResponse(stream_import(iter_stream(request), actor, auth_value),
+                                   media_type="application/x-ndjson")
+
+
 @api.post("/update", summary="修改账号")
 async def acct_update(data: AccountUpdate,
                       actor=Security(get_actor_info, scopes=["acct:update"])
                       ) -> Rsp:
     try:
-        result = UserAPI.update_account(data, actor)
+        result = await db_call(UserAPI.update_account, data, actor)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(**result.value)
@@ -71,7 +253,7 @@ async def acct_delete(data: AccountDelete,
                       actor=Security(get_actor_info, scopes=["acct:delete"])
                       ) -> Rsp:
     try:
-        result = UserAPI.delete_account(data, actor)
+        result = await db_call(UserAPI.delete_account, data, actor)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(**result.value)
@@ -1,33 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from api.schema.app import AppAPI
-from .base import Rsp, get_actor_info, get_pagination
+from api.schema.orm import InvalidCursor
+from .base import Rsp, get_actor_info, get_pagination, get_refdata, RspRoute
+from .etag import etag_response, not_modified, refdata_etag
 
-api = APIRouter(prefix="/app")
+api = APIRouter(prefix="/app", route_class=RspRoute)
 
 
 @api.get("/list", summary="获取应用列表")
-async def get_list(actor=Depends(get_actor_info),
+async def get_list(request: Request,
+                   actor=Depends(get_actor_info),
                    pagination=Depends(get_pagination),
                    app_name: str = Query(default="", description="应用名称"),
-                   app_status: int = Query(default=None, description="应用状态")
+                   app_status: int = Query(default=None, description="应用状态"),
+                   refdata=Depends(get_refdata)
                    ):
+    etag = refdata_etag(request, refdata)
+    if (rsp := not_modified(request, etag)) is not None:
+        return rsp
+
     try:
-        data = AppAPI.get_app_list(actor, pagination, app_name, app_status)
+        data = AppAPI.get_app_list(refdata, pagination, app_name, app_status)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=data)
+    return etag_response(request, Rsp(data=data), etag)
 
 
 @api.get("/service_list", summary="获取应用服务列表")
-async def get_service_list(app_id: int = Query(description="应用ID"),
+async def get_service_list(request: Request,
+                           app_id: int = Query(description="应用ID"),
                            pagination=Depends(get_pagination),
-                           actor=Depends(get_actor_info)
+                           actor=Depends(get_actor_info),
+                           refdata=Depends(get_refdata)
                            ):
+    etag = refdata_etag(request, refdata)
+    if (rsp := not_modified(request, etag)) is not None:
+        return rsp
+
     try:
-        data = AppAPI.get_service_list(actor, pagination, app_id)
+        data = AppAPI.get_service_list(refdata, pagination, app_id)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=data)
+    return etag_response(request, Rsp(data=data), etag)
 
 
 @api.get("/service_role_permission", summary="获取应用角色权限")
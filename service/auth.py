@@ -1,12 +1,13 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from api.config.security import client_aes_api, hash_api, jwt_api
+from api.config.security import client_aes_api, hash_executor, jwt_api, HashPoolBusy
 from api.model.user import UserStatus
 from api.model.org import OrgUserStatus
 from api.schema.auth import AuthAPI, PasswordLogin
 from api.schema.errcode import APIErrors
-from .base import Rsp, get_session, get_login_user, get_actor_info
+from api.schema.profile import MISSING, profile_cache
+from .base import Rsp, get_db_session, get_login_user, get_actor_info, db_call, primary_session, RspRoute
 
 
 @dataclass
@@ -26,20 +27,20 @@ class Jwt:
     scopes: list[str] | None = None
 
 
-api = APIRouter(prefix="/auth")
+api = APIRouter(prefix="/auth", route_class=RspRoute)
 
 
 @api.post("/docs_login")
-async def dosc_login(data=Depends(OAuth2PasswordRequestForm), session=Depends(get_session)):
+async def dosc_login(data=Depends(OAuth2PasswordRequestForm), session=Depends(get_db_session)):
 
     try:
         password = data.password
 
-        # 取默认的密码信息
-        user = AuthAPI.get_account_auth_info(session, data.username)
+        # 取默认的密码信息以及组织信息
+        user = await db_call(AuthAPI.get_login_info, session, data.username)
 
         # 用户是否存在以及账密是否一致
-        if user is None or hash_api.verify(password, user["auth_value"]) == False:
+        if user is None or await hash_executor.verify(password, user["auth_value"]) == False:
             return Rsp(**APIErrors.LOGIN_WRONG_ACCOUNT_PASSWD.value)
 
         # 用户密码认证通过后再判断登录状态是否有效
@@ -49,8 +50,8 @@ async def dosc_login(data=Depends(OAuth2PasswordRequestForm), session=Depends(ge
         # 构建用户jwt
         jwt = Jwt(user_uuid=user["user_uuid"])
 
-        # 获取用户的有效可登录的组织信息
-        org_list = AuthAPI.get_user_org_list(session, user["user_uuid"])
+        # 用户的有效可登录的组织信息
+        org_list = user["org_list"]
 
         if org_list and len(org_list) == 1:
             jwt.org_uuid = org_list[0]["org_uuid"]
@@ -59,6 +60,8 @@ async def dosc_login(data=Depends(OAuth2PasswordRequestForm), session=Depends(ge
 
         payload = jwt_api.encode(**asdict(jwt))
 
+    except HashPoolBusy as e:
+        raise HTTPException(503, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
 
@@ -67,17 +70,17 @@ async def dosc_login(data=Depends(OAuth2PasswordRequestForm), session=Depends(ge
 
 @api.post("/password", summary="账号密码登录")
 async def password_login(data: PasswordLogin,
-                         session=Depends(get_session)
+                         session=Depends(get_db_session)
                          ) -> Rsp:
     try:
         # 客户端密码解密
         password = client_aes_api.decrypt(data.password_enc)
 
-        # 取默认的密码信息
-        user = AuthAPI.get_account_auth_info(session, data.account)
+        # 取默认的密码信息以及组织信息
+        user = await db_call(AuthAPI.get_login_info, session, data.account)
 
         # 用户是否存在以及账密是否一致
-        if user is None or hash_api.verify(password, user["auth_value"]) == False:
+        if user is None or await hash_executor.verify(password, user["auth_value"]) == False:
             return Rsp(**APIErrors.LOGIN_WRONG_ACCOUNT_PASSWD.value)
 
         # 用户密码认证通过后再判断登录状态是否有效
@@ -87,8 +90,8 @@ async def password_login(data: PasswordLogin,
         # 构建用户jwt
         jwt = Jwt(user_uuid=user["user_uuid"])
 
-        # 获取用户的有效可登录的组织信息
-        org_list = AuthAPI.get_user_org_list(session, user["user_uuid"])
+        # 用户的有效可登录的组织信息
+        org_list = user["org_list"]
 
         if org_list and len(org_list) == 1:
             jwt.org_uuid = org_list[0]["org_uuid"]
@@ -96,6 +99,8 @@ async def password_login(data: PasswordLogin,
             jwt.org_is_admin = org_list[0]["is_admin"]
 
         payload = jwt_api.encode(**asdict(jwt))
+    except HashPoolBusy as e:
+        raise HTTPException(503, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(data={"jwt": payload})
@@ -113,7 +118,7 @@ async def choose_org(actor=Depends(get_login_user)) -> Rsp:
 @api.get("/org", summary="获取已登录用户所属的组织信息")
 async def get_user_orgs(actor=Depends(get_login_user)) -> Rsp:
     try:
-        org_list = AuthAPI.get_user_org_list(actor.session, actor.user_uuid)
+        org_list = await db_call(AuthAPI.get_user_org_list, actor.session, actor.user_uuid)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(data=org_list)
@@ -122,7 +127,12 @@ async def get_user_orgs(actor=Depends(get_login_user)) -> Rsp:
 @api.get("/org_user", summary="获取已登录组织用户的信息")
 async def get_org_user_info(actor=Depends(get_actor_info)) -> Rsp:
     try:
-        data = AuthAPI.get_org_user_info(actor)
+        key = (actor.org_uuid, actor.user_uuid)
+        data, version = profile_cache.get(profile_cache.org_users, key)
+        if data is MISSING:
+            # 缓存的值需在失效前保持有效,从主库读取,避免缓存只读副本上尚未同步的旧数据
+            data = await db_call(AuthAPI.get_org_user_info, replace(actor, session=primary_session()))
+            profile_cache.set(profile_cache.org_users, key, data, version)
     except Exception as e:
         raise HTTPException(500, f"{e}")
 
@@ -132,7 +142,10 @@ async def get_org_user_info(actor=Depends(get_actor_info)) -> Rsp:
 @api.get("/org_name", summary="获取已登录组织的名称")
 async def get_org_name(actor=Depends(get_actor_info)) -> Rsp:
     try:
-        data = AuthAPI.get_org_name(actor)
+        data, version = profile_cache.get(profile_cache.org_names, actor.org_uuid)
+        if data is MISSING:
+            data = await db_call(AuthAPI.get_org_name, replace(actor, session=primary_session()))
+            profile_cache.set(profile_cache.org_names, actor.org_uuid, data, version)
     except Exception as e:
         raise HTTPException(500, f"{e}")
 
@@ -1,18 +1,100 @@
-from typing import Generator, Any
+import inspect
+from contextvars import ContextVar
+from dataclasses import replace
+from functools import wraps
+from time import perf_counter, time
+from typing import AsyncGenerator, Callable, Generator, Any
 from pydantic import BaseModel
-from fastapi import HTTPException, Query, Depends
+from fastapi import HTTPException, Query, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.orm import sessionmaker
+from api.config.cache import TTLCache
+from api.config.fastjson import dumps
+from api.config.metrics import metrics
+from api.config.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
+from api.config.replica import ReplicaPool
 from api.config.settings import settings
-from api.config.security import jwt_api
-from api.schema.base import Pagination, Actor
+from api.config.sql_trace import SQLTracer
+from api.config.security import jwt_cache
+from api.schema.base import Pagination, Actor, Permission
+from api.schema.orm import decode_cursor, InvalidCursor
+from api.schema.permission import permission_index
+from api.schema.refdata import RefData, refdata
 
 
-engine = create_engine(settings.db_rds,
-                       echo=False, pool_recycle=settings.pool_recycle_seconds)
+# SQL跟踪,仅在开启时注册到引擎上
+sql_tracer = SQLTracer(slow_ms=settings.sql_slow_ms,
+                       top_n=settings.sql_trace_top_n,
+                       window_seconds=settings.sql_trace_window_seconds)
+
+
+def new_engine(url: str, name: str):
+    """创建带连接池指标的数据库引擎"""
+    engine = create_engine(url, echo=False, poolclass=InstrumentedQueuePool, **settings.db_pool_kwargs)
+    instrument_engine(engine, name)
+    if settings.sql_trace_enable:
+        sql_tracer.attach(engine)
+    return engine
+
+
+def new_async_engine(url: str, name: str):
+    """创建带连接池指标的异步数据库引擎"""
+    engine = create_async_engine(url, echo=False, poolclass=InstrumentedAsyncQueuePool, **settings.db_pool_kwargs)
+    instrument_engine(engine, name)
+    if settings.sql_trace_enable:
+        sql_tracer.attach(engine)
+    return engine
+
+
+def replica_name(url: str) -> str:
+    return "replica:" + make_url(url).render_as_string(hide_password=True)
+
+
+engine = new_engine(settings.db_rds, "primary")
 local_session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# 异步数据库引擎,仅在开启异步模式时创建(依赖greenlet)
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = new_async_engine(settings.db_async_rds, "async_primary")
+    async_local_session = async_sessionmaker(bind=async_engine, autoflush=False,
+                                             expire_on_commit=False)
+
+# 只读副本池
+if settings.db_async:
+    replica_pool = ReplicaPool(settings.db_async_replica_rds,
+                               lambda url: new_async_engine(url, replica_name(url)),
+                               lambda engine: async_sessionmaker(bind=engine, autoflush=False,
+                                                                 expire_on_commit=False),
+                               settings.db_replica_down_seconds)
+else:
+    replica_pool = ReplicaPool(settings.db_replica_rds,
+                               lambda url: new_engine(url, replica_name(url)),
+                               lambda engine: sessionmaker(bind=engine, autoflush=False, autocommit=False),
+                               settings.db_replica_down_seconds)
+
+# 最近发起过写请求的token,在有效期内其读请求仍使用主库;仅在当前worker内有效,
+# 跨worker由写请求响应下发的STICKY_COOKIE判断
+recent_writers = TTLCache(max_size=10000, ttl=settings.db_replica_sticky_seconds)
+
+# 写请求后读请求继续使用主库的截止时间(unix时间戳),任意worker均可判断
+STICKY_COOKIE = "db_primary_until"
+
+
+# 当前请求的响应信息,由指标中间件设置;Rsp创建时写入业务代码
+response_info: ContextVar[dict | None] = ContextVar("response_info", default=None)
+
+db_call_seconds = metrics.histogram("db_call_duration_seconds",
+                                    "schema层数据库操作的耗时(秒),包含等待线程池的时间", ("func",))
+db_call_errors = metrics.counter("db_call_errors_total",
+                                 "schema层数据库操作抛出异常的次数", ("func",))
+
 
 class Rsp(BaseModel):
     """Restful API Response"""
@@ -20,48 +102,280 @@ class Rsp(BaseModel):
     message: str = "Succeed"
     data: Any | None = None
 
+    def model_post_init(self, __context: Any) -> None:
+        if (info := response_info.get()) is not None:
+            info["code"] = self.code
+
+
+def rsp_json(rsp: Rsp) -> bytes:
+    """序列化Rsp;data中的行数据直接序列化,不再经过pydantic校验"""
+    return dumps(dict(code=rsp.code, message=rsp.message, data=rsp.data))
+
+
+class RspResponse(Response):
+    """Rsp的JSON响应,使用orjson(未安装时使用标准库json)序列化"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return rsp_json(content) if isinstance(content, Rsp) else dumps(content)
+
+
+class RspRoute(APIRoute):
+    """接口返回的Rsp直接以RspResponse响应,跳过FastAPI对响应模型的校验以及jsonable_encoder;
+    返回值注解仍用于生成接口文档。与FastAPI一致,同步接口在线程池中执行"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+        @wraps(endpoint)
+        async def call(*args, **kw):
+            if is_coroutine:
+                result = await endpoint(*args, **kw)
+            else:
+                result = await run_in_threadpool(endpoint, *args, **kw)
+            return RspResponse(result) if isinstance(result, Rsp) else result
+
+        super().__init__(path, call, **kwargs)
+
+
+def route_session(request: Request, primary: Callable) -> Callable:
+    """选择请求使用的sessionmaker
+
+    GET请求轮询使用只读副本;写请求、写请求后短时间内同一客户端的读请求以及副本全部不可用时使用主库
+    """
+    if not len(replica_pool):
+        return primary
+
+    token = request.headers.get("authorization")
+    key = None if token is None else jwt_cache.digest(token)
+
+    if request.method not in ("GET", "HEAD"):
+        if key is not None:
+            recent_writers.set(key, True)
+        return primary
+
+    if key is not None and recent_writers.get(key):
+        return primary
+
+    if sticky_until(request.cookies.get(STICKY_COOKIE)) > time():
+        return primary
+
+    replica = replica_pool.choose()
+    return primary if replica is None else replica.session_maker
+
+
+def sticky_until(value: str | None) -> float:
+    """解析STICKY_COOKIE,无效时返回0"""
+    try:
+        return float(value) if value else 0
+    except ValueError:
+        return 0
+
+
+class ReplicaStickyMiddleware:
+    """写请求的响应下发STICKY_COOKIE,有效期内同一客户端的读请求无论由哪个worker处理都使用主库,
+    避免读到副本上尚未同步的数据;仅在配置了只读副本时注册"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                seconds = settings.db_replica_sticky_seconds
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={int(time()) + seconds}; Max-Age={seconds}; Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
 
-def get_session() -> Generator:
+class LazySession:
+    """数据库会话的延迟代理
+
+    首次使用时才创建会话;db_call执行完成后关闭会话,连接立即归还连接池,再次使用时重新创建。
+    鉴权失败以及只读取token的请求不会占用连接,也不会在等待哈希计算、序列化响应时持有连接
+    """
+
+    def __init__(self, factory: Callable) -> None:
+        self._factory = factory
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def detach(self):
+        """取出当前的会话,由调用方负责关闭;未创建时返回None"""
+        session, self._session = self._session, None
+        return session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+def get_session(request: Request) -> Generator:
     """获取数据库会话"""
-    with local_session() as session:
-        yield session
+    lazy = LazySession(route_session(request, local_session))
+    try:
+        yield lazy
+    finally:
+        if (session := lazy.detach()) is not None:
+            session.close()
+
+
+async def get_async_session(request: Request) -> AsyncGenerator:
+    """获取异步数据库会话"""
+    lazy = LazySession(route_session(request, async_local_session))
+    try:
+        yield lazy
+    finally:
+        if (session := lazy.detach()) is not None:
+            await session.close()
+
+
+# 路由使用的数据库会话,由配置决定同步或异步模式
+get_db_session = get_async_session if settings.db_async else get_session
+
+
+def primary_session() -> LazySession:
+    """不经过只读副本路由的主库会话,如启动时的预热,以及写入进程内缓存的读取"""
+    return LazySession(async_local_session if settings.db_async else local_session)
+
+
+def _bind_session(value: Any, session: Any) -> Any:
+    """将参数中的延迟会话替换为实际执行的同步会话"""
+    if isinstance(value, Actor) and isinstance(value.session, LazySession):
+        return replace(value, session=session)
+    if isinstance(value, LazySession):
+        return session
+    return value
+
+
+async def db_call(func: Callable, *args, **kw) -> Any:
+    """执行schema层的数据库操作,避免阻塞事件循环
+
+    同步会话:在线程池中执行
+    异步会话:通过AsyncSession.run_sync在异步连接上执行,schema层代码无需改动
+    执行完成后关闭会话,连接不会持有到请求结束
+
+    Args:
+        func: schema层函数,如UserAPI.get_account_list
+        *args, **kw: 函数参数,其中的Actor或会话对象会绑定到实际执行的会话上
+    """
+    name = getattr(func, "__qualname__", repr(func))
+    start = perf_counter()
+    try:
+        return await _db_call(func, *args, **kw)
+    except Exception:
+        db_call_errors.inc(func=name)
+        raise
+    finally:
+        db_call_seconds.observe(perf_counter() - start, func=name)
+
+
+def _lazy_session(args: tuple, kw: dict) -> LazySession | None:
+    return next((value.session if isinstance(value, Actor) else value
+                 for value in (*args, *kw.values())
+                 if isinstance(value, LazySession)
+                 or isinstance(value, Actor) and isinstance(value.session, LazySession)), None)
+
+
+async def _db_call(func: Callable, *args, **kw) -> Any:
+    if (lazy := _lazy_session(args, kw)) is None:
+        return await run_in_threadpool(func, *args, **kw)
+
+    def call(sync_session):
+        return func(*[_bind_session(v, sync_session) for v in args],
+                    **{k: _bind_session(v, sync_session) for k, v in kw.items()})
+
+    # 执行完成后关闭会话,未提交的变更回滚,连接归还连接池
+    if not settings.db_async:
+        def call_and_close():
+            session = lazy.session
+            try:
+                return call(session)
+            finally:
+                lazy.detach()
+                session.close()
+
+        return await run_in_threadpool(call_and_close)
+
+    session = lazy.session
+    try:
+        return await session.run_sync(call)
+    finally:
+        lazy.detach()
+        await session.close()
 
 
 def get_pagination(page_idx: int = Query(default=1, description="页数"),
-                   page_size: int = Query(default=10, description="每页数量")
+                   page_size: int = Query(default=10, description="每页数量"),
+                   cursor: str = Query(default=None,
+                                       description="游标分页:首页传空字符串,后续传上一页返回的next_cursor;不传则按页码分页"),
+                   with_total: bool = Query(default=False, description="游标分页时是否统计总数"),
+                   estimate_total: bool = Query(default=False, description="无过滤条件时按表统计信息估算总数")
                    ) -> Pagination:
-    return Pagination(page_idx=page_idx, page_size=page_size)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(400, f"{e}")
+    return Pagination(page_idx=page_idx, page_size=page_size, cursor=cursor,
+                      with_total=with_total, estimate_total=estimate_total)
 
 
 auth_bear = OAuth2PasswordBearer("/auth/docs_login")
 
 
 def get_login_user(token=Depends(auth_bear),
-                   session=Depends(get_session)
+                   session=Depends(get_db_session)
                    ) -> Actor:
     """获取操作者信息"""
     try:
-        jwt = jwt_api.decode(token)
+        jwt = jwt_cache.decode(token)
         user_uuid = jwt["user_uuid"]
         org_uuid = jwt["org_uuid"]
         org_owner = jwt["org_owner"]
+        org_is_admin = jwt.get("org_is_admin", False)
         scopes = jwt["scopes"]
 
     except Exception as e:
         raise HTTPException(401, f"{e}")
 
-    return Actor(session=session, user_uuid=user_uuid, org_uuid=org_uuid, is_org_owner=org_owner)
+    return Actor(session=session, user_uuid=user_uuid, org_uuid=org_uuid,
+                 is_org_owner=org_owner, is_org_admin=org_is_admin)
 
 
-def get_actor_info(security_scope: SecurityScopes,
-                   actor=Depends(get_login_user)
-                   ) -> Actor:
+async def get_actor_info(security_scope: SecurityScopes,
+                         actor=Depends(get_login_user)
+                         ) -> Actor:
     try:
 
         # 组织所有者无需鉴权
         if actor.is_org_owner:
             return actor
 
+        # 接口带鉴权标识时,需在已选择的组织内拥有对应服务的权限
+        if settings.permission_enable and security_scope.scopes:
+            if actor.org_uuid is None:
+                raise HTTPException(403, "Access Dined")
+
+            if (permission := permission_index.get(actor.org_uuid, actor.user_uuid)) is None:
+                index = await db_call(permission_index.load, actor.session, actor.org_uuid)
+                permission = index.get(actor.user_uuid, Permission())
+
+            if not permission.allows(security_scope.scopes):
+                raise HTTPException(403, "Access Dined")
+
+            actor.permission = permission
+
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -70,6 +384,23 @@ def get_actor_info(security_scope: SecurityScopes,
     return actor
 
 
+async def get_refdata(session=Depends(get_db_session)) -> RefData:
+    """获取参考数据快照,快照过期时才访问数据库"""
+    if (data := refdata.get()) is not None:
+        return data
+    try:
+        return await db_call(refdata.load, session)
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+
+
+def get_admin_actor(actor=Depends(get_login_user)) -> Actor:
+    """获取平台管理者组织的操作者信息,用于内部运维接口"""
+    if not actor.is_org_admin:
+        raise HTTPException(403, "Access Dined")
+    return actor
+
+
 # def get_actor_info(security_scopes: SecurityScopes, actor=Depends(get_login_user)) -> Actor:
 #     try:
 #         # 用户状态需要保障是有效的
@@ -0,0 +1,57 @@
+from hashlib import blake2b
+from fastapi import Request, Response
+from api.config.settings import settings
+from api.schema.refdata import RefData
+from .base import Rsp, rsp_json
+
+# 响应包含登录用户可见的数据,只允许客户端缓存,且每次使用前需重新验证
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: bytes | str) -> str:
+    digest = blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match是否包含etag,按弱比较忽略W/前缀"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (v.strip().removeprefix("W/") for v in header.split(","))
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """请求的ETag与当前一致时返回304,否则返回None;用于在查询以及序列化之前判断"""
+    if not settings.etag_enable or not etag_matches(request, etag):
+        return None
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def etag_response(request: Request, rsp: Rsp, etag: str | None = None) -> Response | Rsp:
+    """带ETag的响应;未提供etag时按序列化后的内容计算,内容未变化时返回304
+
+    响应体只序列化一次,直接作为响应返回。未提供etag时查询以及序列化照常执行,只节省传输;
+    可在查询前得到版本号的接口(如参考数据)应先调用not_modified,再传入同一个etag
+    """
+    if not settings.etag_enable:
+        return rsp
+
+    if etag is not None and (response := not_modified(request, etag)) is not None:
+        return response
+
+    body = rsp_json(rsp)
+    etag = etag or make_etag(body)
+    if (response := not_modified(request, etag)) is not None:
+        return response
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def refdata_etag(request: Request, refdata: RefData) -> str:
+    """参考数据接口的ETag:快照的内容摘要以及请求参数;内容相同时各worker的摘要一致,无需查询即可判断"""
+    return make_etag(refdata.digest, request.url.path, str(request.query_params))
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from api.config.metrics import metrics
+from api.config.pool import pool_stats
+from api.config.security import hash_executor, jwt_cache
+from api.config.settings import settings
+from api.schema.permission import permission_index
+from api.schema.profile import cache_bus, profile_cache
+from api.schema.refdata import invalidate_refdata, refdata
+from .base import Rsp, get_admin_actor, replica_pool, sql_tracer, RspRoute
+from .profile import profiler
+
+api = APIRouter(prefix="/internal", dependencies=[Depends(get_admin_actor)], route_class=RspRoute)
+
+
+@api.get("/hash_pool", summary="获取密码哈希执行池的饱和度信息")
+async def get_hash_pool() -> Rsp:
+    return Rsp(data=hash_executor.stats())
+
+
+@api.get("/jwt_cache", summary="获取JWT缓存的命中信息")
+async def get_jwt_cache() -> Rsp:
+    return Rsp(data=jwt_cache.stats())
+
+
+@api.get("/permission_index", summary="获取权限索引的加载信息")
+async def get_permission_index() -> Rsp:
+    return Rsp(data=permission_index.stats())
+
+
+@api.get("/profile_cache", summary="获取组织以及组织用户资料缓存的命中信息")
+async def get_profile_cache() -> Rsp:
+    return Rsp(data=dict(**profile_cache.stats(), bus=cache_bus.stats()))
+
+
+@api.get("/refdata", summary="获取参考数据快照的加载信息")
+async def get_refdata_stats() -> Rsp:
+    return Rsp(data=refdata.stats())
+
+
+@api.post("/refdata/reload", summary="通知所有worker重新加载参考数据快照",
+          description="直接修改角色、应用或应用服务表后调用;未调用时在快照过期后按表指纹检查")
+async def reload_refdata() -> Rsp:
+    invalidate_refdata()
+    return Rsp(data=refdata.stats())
+
+
+@api.get("/db_replicas", summary="获取只读副本的可用状态")
+async def get_db_replicas() -> Rsp:
+    return Rsp(data=replica_pool.stats())
+
+
+@api.get("/db_pool", summary="获取数据库连接池的使用情况")
+async def get_db_pool() -> Rsp:
+    return Rsp(data=dict(pools=pool_stats(), metrics=metrics.snapshot("db_pool_")))
+
+
+@api.get("/metrics", summary="获取进程内的全部指标")
+async def get_metrics() -> Rsp:
+    return Rsp(data=metrics.snapshot())
+
+
+@api.get("/slow_sql", summary="获取最慢的SQL语句以及语句耗时汇总")
+async def get_slow_sql() -> Rsp:
+    return Rsp(data=dict(enable=settings.sql_trace_enable, **sql_tracer.dump()))
+
+
+@api.post("/slow_sql/reset", summary="清空SQL跟踪记录")
+async def reset_slow_sql() -> Rsp:
+    sql_tracer.reset()
+    return Rsp()
+
+
+def check_profiling() -> None:
+    if not settings.profiling_enable:
+        raise HTTPException(404, "Profiling disabled")
+    if profiler.busy:
+        raise HTTPException(409, "Profiling in progress")
+
+
+@api.post("/profile/sample", summary="采样整个worker,返回折叠栈")
+async def profile_sample(seconds: float = Query(default=10, gt=0, description="采样时间(秒)")) -> PlainTextResponse:
+    check_profiling()
+    profiler.busy = True
+    try:
+        sampler = await profiler.sample(min(seconds, settings.profiling_max_seconds),
+                                        settings.profiling_interval_ms / 1000)
+    finally:
+        profiler.busy = False
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Samples": str(sampler.samples)})
+
+
+@api.post("/profile/route", summary="采样之后N个请求该路由的请求,返回折叠栈")
+async def profile_route(route: str = Query(description="请求路径,如/account/list"),
+                        requests: int = Query(default=10, gt=0, description="采样的请求数"),
+                        timeout: float = Query(default=30, gt=0, description="最长等待时间(秒)")
+                        ) -> PlainTextResponse:
+    check_profiling()
+    profiler.busy = True
+    try:
+        profile = await profiler.sample_route(route, requests,
+                                              min(timeout, settings.profiling_max_seconds),
+                                              settings.profiling_interval_ms / 1000)
+    finally:
+        profiler.busy = False
+    return PlainTextResponse(profile.sampler.collapsed(),
+                             headers={"X-Samples": str(profile.sampler.samples),
+                                      "X-Requests": str(profile.finished)})
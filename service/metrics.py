@@ -0,0 +1,80 @@
+from hmac import compare_digest
+from time import perf_counter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from api.config.metrics import metrics
+from api.config.settings import settings
+from .base import response_info
+
+api = APIRouter()
+
+http_requests = metrics.counter("http_requests_total",
+                                "请求数", ("method", "route", "status"))
+http_request_seconds = metrics.histogram("http_request_duration_seconds",
+                                         "请求耗时(秒)", ("method", "route"))
+http_in_flight = metrics.gauge("http_requests_in_flight",
+                               "正在处理的请求数", ("method", "route"))
+api_responses = metrics.counter("api_responses_total",
+                                "按Rsp业务代码(APIErrors)统计的响应数", ("route", "code"))
+
+# 未匹配任何路由的请求统一使用该标签,避免路径过多
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """请求对应的路由模板,如/account/list;路由匹配后才能获取"""
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+
+async def track_in_flight(request: Request):
+    """路由依赖:统计正在处理的请求数"""
+    labels = dict(method=request.method, route=route_template(request.scope))
+    http_in_flight.inc(**labels)
+    try:
+        yield
+    finally:
+        http_in_flight.dec(**labels)
+
+
+class MetricsMiddleware:
+    """按路由模板统计请求数以及耗时,并按Rsp的业务代码统计响应数"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        info = {}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = response_info.set(info)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method, route = scope["method"], route_template(scope)
+            http_request_seconds.observe(perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status)
+            if "code" in info:
+                api_responses.inc(route=route, code=info["code"])
+            response_info.reset(token)
+
+
+@api.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus文本格式的指标;配置metrics_token时需携带Bearer token"""
+    if settings.metrics_token:
+        authorization = request.headers.get("authorization", "")
+        if not compare_digest(authorization, f"Bearer {settings.metrics_token}"):
+            raise HTTPException(401, "Unauthorized")
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
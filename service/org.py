@@ -1,23 +1,39 @@
 # from api.schema.org import OrgAPI, OrgCreate, OrgUpdate, OrgDelete
-from fastapi import APIRouter, HTTPException, Query, Depends, Security
-from api.schema.org import OrgAPI, OrgCreate, OrgUpdate
-from .base import Rsp, get_pagination, get_actor_info
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Security
+from api.schema.errcode import APIErrors
+from api.schema.org import OrgAPI, OrgCreate, OrgUpdate, OrgMemberAdd, OrgMemberRemove, OrgMemberRole
+from api.schema.orm import InvalidCursor
+from .base import Rsp, get_pagination, get_actor_info, db_call, RspRoute
+from .etag import etag_response
 
-api = APIRouter(prefix="/org")
+api = APIRouter(prefix="/org", route_class=RspRoute)
+
+
+def member_rsp(err, results: list[dict]) -> Rsp:
+    """组织成员批量操作的响应:整体的错误码以及每个用户的结果"""
+    if err != APIErrors.NO_ERROR:
+        return Rsp(**err.value)
+
+    succeed = sum(1 for v in results if v["code"] == APIErrors.NO_ERROR.code)
+    return Rsp(data=dict(total=len(results), succeed=succeed, failed=len(results) - succeed, results=results))
 
 
 @api.get("/list", summary="获取组织列表信息")
-async def get_org_list(org_name: str = Query(default="", description="组织名称"),
+async def get_org_list(request: Request,
+                       org_name: str = Query(default="", description="组织名称"),
                        org_status: int = Query(
                            default=None, description="组织状态"),
                        pagination=Depends(get_pagination),
                        actor=Security(get_actor_info, scopes=["org:list"])
                        ) -> Rsp:
     try:
-        data = OrgAPI.get_org_list(actor, pagination, org_name, org_status)
+        data = await db_call(OrgAPI.get_org_list, actor, pagination, org_name, org_status)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=data)
+    # 按内容计算ETag,只节省传输:owner_name来自关联的用户,统计过滤后全部行的版本与查询当前页的代价相当
+    return etag_response(request, Rsp(data=data))
 
 
 @api.get("/detail", summary="获取组织详情信息")
@@ -25,29 +41,65 @@ async def get_org_detail(org_uuid: str = Query(description="组织UUID"),
                          actor=Security(get_actor_info, scopes=["org:detail"])
                          ) -> Rsp:
     try:
-        data = OrgAPI.get_org_detail(actor, org_uuid)
+        data = await db_call(OrgAPI.get_org_detail, actor, org_uuid)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(data=data)
 
 
-# @api.get("/user_list", summary="获取组织用户信息")
-# async def get_org_user(org_uuid: str = Query(description="组织UUID"),
-#                        pagination=Depends(get_pagination),
-#                        actor=Security(get_actor_info, scopes=["org:detail"])
-#                        ) -> Rsp:
-#     try:
-#         ...
-#     except Exception as e:
-#         raise HTTPException(500, f"{e}")
-#     return Rsp()
+@api.get("/user_list", summary="获取组织用户信息")
+async def get_org_user(org_uuid: str = Query(description="组织UUID"),
+                       pagination=Depends(get_pagination),
+                       actor=Security(get_actor_info, scopes=["org:detail"])
+                       ) -> Rsp:
+    try:
+        data = await db_call(OrgAPI.get_org_user_list, actor, pagination, org_uuid)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+    return Rsp(data=data)
+
+
+@api.post("/member/add", summary="批量添加组织用户")
+async def add_org_members(data: OrgMemberAdd,
+                          actor=Security(get_actor_info, scopes=["org:update"])
+                          ) -> Rsp:
+    try:
+        err, results = await db_call(OrgAPI.add_members, actor, data)
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+    return member_rsp(err, results)
+
+
+@api.post("/member/remove", summary="批量移出组织用户")
+async def remove_org_members(data: OrgMemberRemove,
+                             actor=Security(get_actor_info, scopes=["org:update"])
+                             ) -> Rsp:
+    try:
+        err, results = await db_call(OrgAPI.remove_members, actor, data)
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+    return member_rsp(err, results)
+
+
+@api.post("/member/role", summary="批量分配组织用户角色")
+async def assign_org_member_roles(data: OrgMemberRole,
+                                  actor=Security(get_actor_info, scopes=["org:update"])
+                                  ) -> Rsp:
+    try:
+        err, results = await db_call(OrgAPI.assign_member_roles, actor, data)
+    except Exception as e:
+        raise HTTPException(500, f"{e}")
+    return member_rsp(err, results)
+
 
 @api.post("/create", summary="创建组织")
 async def create_org(data: OrgCreate,
                      actor=Security(get_actor_info, scopes=["org:create"])
                      ) -> Rsp:
     try:
-        result = OrgAPI.create_org(actor, data)
+        result = await db_call(OrgAPI.create_org, actor, data)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(**result.value)
@@ -58,7 +110,7 @@ async def update_org(data: OrgUpdate,
                      actor=Security(get_actor_info, scopes=["org:update"])
                      ) -> Rsp:
     try:
-        result = OrgAPI.update_org(actor, data)
+        result = await db_call(OrgAPI.update_org, actor, data)
     except Exception as e:
         raise HTTPException(500, f"{e}")
     return Rsp(**result.value)
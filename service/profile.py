@@ -0,0 +1,84 @@
+import asyncio
+from starlette.types import ASGIApp, Receive, Scope, Send
+from api.config.profiler import StackSampler
+
+
+class RouteProfile:
+    """路由采样任务:对之后N个请求该路由的请求进行采样
+
+    采样仅在这些请求处理期间进行,但会采集所有线程,同时处理中的其他请求也会计入
+    """
+
+    def __init__(self, route: str, requests: int, interval: float) -> None:
+        self.route = route
+        self.remaining = requests
+        self.active = 0
+        self.finished = 0
+        self.sampler = StackSampler(interval, gate=lambda: self.active > 0)
+        self.done = asyncio.Event()
+
+    def claim(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self.finished += 1
+        if self.remaining <= 0 and self.active == 0:
+            self.done.set()
+
+
+class Profiler:
+    """在线采样的控制器,同一时间只允许一个采样任务"""
+
+    def __init__(self) -> None:
+        self.busy = False
+        self.route_profile: RouteProfile | None = None
+
+    async def sample(self, seconds: float, interval: float) -> StackSampler:
+        """采样整个worker进程"""
+        sampler = StackSampler(interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        return sampler
+
+    async def sample_route(self, route: str, requests: int, timeout: float, interval: float) -> RouteProfile:
+        """采样之后requests个请求route的请求,超时后返回已采集的部分"""
+        profile = RouteProfile(route, requests, interval)
+        profile.sampler.start()
+        self.route_profile = profile
+        try:
+            await asyncio.wait_for(profile.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.route_profile = None
+            profile.sampler.stop()
+        return profile
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """将命中采样任务的请求标记为采样中;仅在开启profiling_enable时注册"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile = profiler.route_profile
+        if (scope["type"] != "http" or profile is None
+                or scope["path"] != profile.route or not profile.claim()):
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.release()
@@ -1,30 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from api.schema.role import RoleAPI
-from .base import Rsp, get_actor_info, get_pagination
+from api.schema.orm import InvalidCursor
+from .base import Rsp, get_actor_info, get_pagination, get_refdata, RspRoute
+from .etag import etag_response, not_modified, refdata_etag
 
-api = APIRouter(prefix="/role")
+api = APIRouter(prefix="/role", route_class=RspRoute)
 
 
 @api.get("/list", summary="获取角色列表信息")
-async def get_list(role_name: str = Query(default="", description="角色名称"),
+async def get_list(request: Request,
+                   role_name: str = Query(default="", description="角色名称"),
                    role_status: int = Query(default=None, description="角色状态"),
                    actor=Depends(get_actor_info),
-                   pagination=Depends(get_pagination)
+                   pagination=Depends(get_pagination),
+                   refdata=Depends(get_refdata)
                    ) -> Rsp:
+    etag = refdata_etag(request, refdata)
+    if (rsp := not_modified(request, etag)) is not None:
+        return rsp
+
     try:
-        role_list = RoleAPI.get_role_list(
-            actor, pagination, role_name, role_status)
+        role_list = RoleAPI.get_role_list(refdata, pagination, role_name, role_status)
+    except InvalidCursor as e:
+        raise HTTPException(400, f"{e}")
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=role_list)
+    return etag_response(request, Rsp(data=role_list), etag)
 
 
 @api.get("/detail", summary="获取角色详情")
-async def get_detail(role_id: int = Query(description="角色ID"),
-                     actor=Depends(get_actor_info)
+async def get_detail(request: Request,
+                     role_id: int = Query(description="角色ID"),
+                     actor=Depends(get_actor_info),
+                     refdata=Depends(get_refdata)
                      ) -> Rsp:
+    etag = refdata_etag(request, refdata)
+    if (rsp := not_modified(request, etag)) is not None:
+        return rsp
+
     try:
-        role = RoleAPI.get_detail(actor, role_id)
+        role = RoleAPI.get_detail(refdata, role_id)
     except Exception as e:
         raise HTTPException(500, f"{e}")
-    return Rsp(data=role)
+    return etag_response(request, Rsp(data=role), etag)
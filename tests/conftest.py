@@ -0,0 +1,32 @@
+"""测试使用SQLite内存数据库;与bench相同,在仓库的上级目录以api包的形式运行:
+
+    python -m pytest api/tests
+"""
+import os
+import pytest
+from sqlalchemy import create_engine, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+# service层在导入时按db_rds创建连接池,测试不连接该数据库
+os.environ.setdefault("DB_RDS", "sqlite://")
+
+from api.model.base import ModelBase
+from api.model import app, org, role, user  # noqa: F401 注册所有表
+
+
+@compiles(BigInteger, "sqlite")
+def sqlite_bigint(type_, compiler, **kw):
+    # SQLite仅INTEGER PRIMARY KEY自增
+    return "INTEGER"
+
+
+@pytest.fixture
+def session():
+    """建好所有表的SQLite内存数据库会话"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    ModelBase.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
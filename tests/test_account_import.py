@@ -0,0 +1,48 @@
+import asyncio
+import json
+from api.config.settings import settings
+from api.schema.errcode import APIErrors
+from api.schema.user import AccountCreate, batch_row_result
+from api.service import account
+
+
+async def fake_db_call(func, data, actor, auth_value, indexes):
+    # 不访问数据库,有效行全部写入成功
+    return [batch_row_result(index, row.account, APIErrors.NO_ERROR) for index, row in zip(indexes, data)]
+
+
+async def rows(values: list):
+    for index, value in enumerate(values):
+        # 以bad开头的行模拟解析失败,与iter_stream相同返回错误信息
+        yield index, value if value.startswith("bad") else AccountCreate(account=value, nick_name=value, user_status=0)
+
+
+def collect(values: list) -> list[dict]:
+    async def run():
+        return [json.loads(line) async for chunk in account.stream_import(rows(values), None, "")
+                for line in chunk.splitlines()]
+    return asyncio.run(run())
+
+
+def test_stream_keeps_input_order(monkeypatch):
+    monkeypatch.setattr(account, "db_call", fake_db_call)
+    monkeypatch.setattr(settings, "account_batch_chunk_size", 3)
+    # 无效行夹在尚未写入的有效行之间
+    values = ["user01", "bad row", "user02", "user03", "bad row", "user04", "bad row", "user05"]
+
+    *results, last = collect(values)
+
+    assert [v["index"] for v in results] == list(range(len(values)))
+    assert [v["code"] == APIErrors.NO_ERROR.code for v in results] == [not v.startswith("bad") for v in values]
+    assert last == dict(summary=dict(total=8, succeed=5, failed=3))
+
+
+def test_stream_flushes_before_too_large(monkeypatch):
+    monkeypatch.setattr(account, "db_call", fake_db_call)
+    monkeypatch.setattr(settings, "account_batch_max_rows", 3)
+
+    *results, last = collect(["user01", "bad row", "user02", "user03", "user04"])
+
+    assert [v["index"] for v in results] == [0, 1, 2, 3]
+    assert results[-1]["code"] == APIErrors.USER_BATCH_TOO_LARGE.code
+    assert last["summary"]["total"] == 4
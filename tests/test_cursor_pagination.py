@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from itertools import product
+import pytest
+from sqlalchemy import select
+from api.model.role import Role
+from api.schema.orm import cursor_pagination, sort_rows
+from api.schema.refdata import fetch_rows
+
+# (排序列,是否倒序);同一组合中的各列均有大量重复值,只有ID兜底才能唯一定位
+ORDERS = [
+    [("created_at", True)],
+    [("created_at", False)],
+    [("role_status", False), ("created_at", True)],
+    [("role_status", True), ("created_at", False)],
+    [("role_status", True), ("created_at", True), ("role_name", False)],
+    [("role_name", False), ("role_status", True)],
+]
+
+
+@pytest.fixture
+def roles(session):
+    # 25行:created_at每4行重复,role_status只有3种取值,role_name每5行重复
+    start = datetime(2026, 1, 1)
+    session.add_all([Role(role_name=f"role{i % 5}", org_uuid="", role_status=i % 3,
+                          created_at=start + timedelta(hours=i // 4))
+                     for i in range(25)])
+    session.commit()
+    return session
+
+
+def walk(session, order: list[tuple[str, bool]], page_size: int) -> list[int]:
+    """从首页开始按next_cursor翻到最后一页,返回依次读到的ID"""
+    stmt = select(Role.id, Role.role_name, Role.role_status, Role.created_at).where(Role.is_deleted == False)
+    expressions = [getattr(Role, key).desc() if descending else getattr(Role, key).asc() for key, descending in order]
+
+    cursor, ids = "", []
+    while cursor is not None:
+        page = cursor_pagination(session, stmt, Role.id, cursor, page_size, expressions)
+        assert len(page["records"]) <= page_size
+        ids.extend(record["id"] for record in page["records"])
+        cursor = page["next_cursor"]
+        # 谓词有误时游标可能原地打转,超过总行数即停止
+        assert len(ids) <= 25
+    return ids
+
+
+@pytest.mark.parametrize("order, page_size", product(ORDERS, [1, 2, 3, 4, 7, 25, 30]))
+def test_walk_visits_every_row_once_in_order(roles, order, page_size):
+    rows = fetch_rows(roles, select(Role.id, Role.role_name, Role.role_status, Role.created_at))
+    # ID兜底的方向与第一个排序列相同
+    expected = [row["id"] for row in sort_rows(rows, [*order, ("id", order[0][1])])]
+
+    assert walk(roles, order, page_size) == expected
+
+
+def test_walk_skips_filtered_rows(roles):
+    roles.execute(Role.__table__.update().where(Role.id % 4 == 0).values(is_deleted=True))
+    roles.commit()
+
+    ids = walk(roles, [("role_status", False), ("created_at", True)], 3)
+
+    assert sorted(ids) == [i for i in range(1, 26) if i % 4]
+
+
+def test_last_page_has_no_cursor(roles):
+    stmt = select(Role.id).where(Role.is_deleted == False)
+
+    page = cursor_pagination(roles, stmt, Role.id, "", 25, [Role.created_at.desc()])
+
+    assert len(page["records"]) == 25
+    assert page["next_cursor"] is None
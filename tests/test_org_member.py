@@ -0,0 +1,164 @@
+import pytest
+from sqlalchemy import select
+from api.model.org import Org, OrgUser, OrgUserRole, OrgUserStatus
+from api.model.role import Role
+from api.model.user import User
+from api.schema import orm
+from api.schema.base import Actor, Permission
+from api.schema.errcode import APIErrors
+from api.schema.org import OrgAPI, OrgMemberAdd, OrgMemberRemove, OrgMemberRole
+
+
+@pytest.fixture(params=["native", "generic"])
+def actor(request, session, monkeypatch):
+    """generic:模拟不支持upsert语句的数据库,使用先查询再写入的方式"""
+    if request.param == "generic":
+        monkeypatch.setattr(orm, "upsert_stmt", lambda *args, **kw: None)
+
+    session.add_all([
+        Org(org_uuid="admin", org_name="平台", owner_uuid="u0", is_admin=True),
+        Org(org_uuid="o1", org_name="o1", owner_uuid="u0"),
+        Role(id=1, role_name="默认角色", org_uuid=""),
+        Role(id=2, role_name="o1角色", org_uuid="o1"),
+        Role(id=3, role_name="其他组织角色", org_uuid="o2"),
+        OrgUser(org_uuid="o1", user_uuid="u0"),
+        *[User(user_uuid=f"u{i}", account=f"user{i}", nick_name=f"用户{i}") for i in range(4)],
+    ])
+    session.commit()
+    return Actor(session=session, user_uuid="u0", org_uuid="admin", is_org_admin=True)
+
+
+def codes(results: list[dict]) -> dict[str, int]:
+    return {v["user_uuid"]: v["code"] for v in results}
+
+
+def members(session, org_uuid: str = "o1") -> dict[str, int]:
+    stmt = select(OrgUser.user_uuid, OrgUser.org_user_status).where(OrgUser.org_uuid == org_uuid)
+    return {user_uuid: status for user_uuid, status in session.execute(stmt)}
+
+
+def member_roles(session, org_uuid: str = "o1") -> set[tuple[str, int]]:
+    stmt = select(OrgUserRole.user_uuid, OrgUserRole.role_id).where(OrgUserRole.org_uuid == org_uuid)
+    return {(user_uuid, role_id) for user_uuid, role_id in session.execute(stmt)}
+
+
+def test_add_members(actor):
+    err, results = OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1", "u2", "u9", "u1"],
+                                                           role_ids=[1, 2]))
+
+    assert err == APIErrors.NO_ERROR
+    assert codes(results) == {"u1": APIErrors.NO_ERROR.code,
+                              "u2": APIErrors.NO_ERROR.code,
+                              "u9": APIErrors.ORG_MEMBER_USER_NOT_AVAIABLE.code}
+    assert members(actor.session) == {"u0": 1, "u1": 1, "u2": 1}
+    assert member_roles(actor.session) == {("u1", 1), ("u1", 2), ("u2", 1), ("u2", 2)}
+
+
+def test_add_existing_members_updates_status(actor):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1"], role_ids=[1]))
+    err, results = OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1", "u2"], role_ids=[1],
+                                                           org_user_status=OrgUserStatus.DISABLE.value))
+
+    assert err == APIErrors.NO_ERROR
+    assert set(codes(results).values()) == {APIErrors.NO_ERROR.code}
+    assert members(actor.session) == {"u0": 1, "u1": 0, "u2": 0}
+    assert member_roles(actor.session) == {("u1", 1), ("u2", 1)}
+
+
+def test_add_members_rejects_unavailable_roles(actor):
+    err, results = OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1"], role_ids=[3]))
+
+    assert err == APIErrors.ORG_MEMBER_ROLE_NOT_AVAIABLE
+    assert results == []
+    assert members(actor.session) == {"u0": 1}
+
+
+def test_remove_members(actor):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1", "u2"], role_ids=[1]))
+    err, results = OrgAPI.remove_members(actor, OrgMemberRemove(org_uuid="o1", user_uuids=["u0", "u1", "u3"]))
+
+    assert err == APIErrors.NO_ERROR
+    assert codes(results) == {"u0": APIErrors.ORG_MEMBER_OWNER_REMOVE_DINED.code,
+                              "u1": APIErrors.NO_ERROR.code,
+                              "u3": APIErrors.ORG_MEMBER_NOT_IN_ORG.code}
+    assert members(actor.session) == {"u0": 1, "u2": 1}
+    assert member_roles(actor.session) == {("u2", 1)}
+
+
+def test_assign_member_roles(actor):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1", "u2"], role_ids=[1]))
+    err, results = OrgAPI.assign_member_roles(actor, OrgMemberRole(org_uuid="o1", user_uuids=["u1", "u3"],
+                                                                   role_ids=[1, 2]))
+
+    assert err == APIErrors.NO_ERROR
+    assert codes(results) == {"u1": APIErrors.NO_ERROR.code, "u3": APIErrors.ORG_MEMBER_NOT_IN_ORG.code}
+    assert member_roles(actor.session) == {("u1", 1), ("u1", 2), ("u2", 1)}
+
+
+def test_assign_member_roles_replace(actor):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1", "u2"], role_ids=[1]))
+    err, _ = OrgAPI.assign_member_roles(actor, OrgMemberRole(org_uuid="o1", user_uuids=["u1"],
+                                                             role_ids=[2], replace=True))
+
+    assert err == APIErrors.NO_ERROR
+    assert member_roles(actor.session) == {("u1", 2), ("u2", 1)}
+
+
+@pytest.mark.parametrize("call, data", [
+    (OrgAPI.add_members, OrgMemberAdd(org_uuid="admin", user_uuids=["u1"])),
+    (OrgAPI.remove_members, OrgMemberRemove(org_uuid="admin", user_uuids=["u1"])),
+    (OrgAPI.assign_member_roles, OrgMemberRole(org_uuid="admin", user_uuids=["u1"], role_ids=[1])),
+])
+def test_admin_org_rejected(actor, call, data):
+    err, results = call(actor, data)
+
+    assert err == APIErrors.ORG_ADMIN_CTRL_DINED
+    assert results == []
+    assert members(actor.session, "admin") == {}
+
+
+def test_unknown_org_rejected(actor):
+    err, results = OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o9", user_uuids=["u1"]))
+
+    assert err == APIErrors.ORG_NOT_AVAIABLE
+    assert results == []
+
+
+def test_add_members_skips_owner(actor):
+    err, results = OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u0", "u1"], role_ids=[1],
+                                                           org_user_status=OrgUserStatus.DISABLE.value))
+
+    assert err == APIErrors.NO_ERROR
+    assert codes(results) == {"u0": APIErrors.ORG_MEMBER_OWNER_CTRL_DINED.code, "u1": APIErrors.NO_ERROR.code}
+    assert members(actor.session) == {"u0": 1, "u1": 0}
+    assert member_roles(actor.session) == {("u1", 1)}
+
+
+@pytest.mark.parametrize("org_uuid, permission", [("o1", None), ("o2", Permission()), (None, None)])
+@pytest.mark.parametrize("call, data", [
+    (OrgAPI.add_members, OrgMemberAdd(org_uuid="o1", user_uuids=["u2"], role_ids=[2])),
+    (OrgAPI.remove_members, OrgMemberRemove(org_uuid="o1", user_uuids=["u2"])),
+    (OrgAPI.assign_member_roles, OrgMemberRole(org_uuid="o1", user_uuids=["u2"], role_ids=[2])),
+])
+def test_non_manager_rejected(actor, org_uuid, permission, call, data):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u2"], role_ids=[1]))
+    # 未开启服务鉴权(permission为None),或鉴权通过的是其他组织
+    other = Actor(session=actor.session, user_uuid="u1", org_uuid=org_uuid, permission=permission)
+
+    err, results = call(other, data)
+
+    assert err == APIErrors.ORG_MEMBER_CTRL_DINED
+    assert results == []
+    assert members(actor.session) == {"u0": 1, "u2": 1}
+    assert member_roles(actor.session) == {("u2", 1)}
+
+
+def test_member_with_org_permission_allowed(actor):
+    OrgAPI.add_members(actor, OrgMemberAdd(org_uuid="o1", user_uuids=["u1"]))
+    member = Actor(session=actor.session, user_uuid="u1", org_uuid="o1",
+                   permission=Permission(scopes=frozenset({"org:update"})))
+
+    err, results = OrgAPI.add_members(member, OrgMemberAdd(org_uuid="o1", user_uuids=["u2"]))
+
+    assert err == APIErrors.NO_ERROR
+    assert codes(results) == {"u2": APIErrors.NO_ERROR.code}
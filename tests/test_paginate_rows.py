@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from itertools import product
+import pytest
+from sqlalchemy import select, literal
+from api.model.role import Role
+from api.schema.base import Pagination
+from api.schema import orm
+from api.schema.orm import InvalidCursor, encode_cursor, invalidate_counts, paginate, paginate_rows, sort_rows
+from api.schema.refdata import fetch_rows, ilike, like_pattern
+
+COLUMNS = ["id", "role_name", "role_status", "created_at"]
+ORDER = [("created_at", True)]
+
+
+@pytest.fixture
+def roles(session):
+    # created_at有重复,验证按ID兜底排序
+    start = datetime(2026, 1, 1)
+    session.add_all([Role(role_name=name, org_uuid="", role_status=i % 2, created_at=start + timedelta(days=i // 3))
+                     for i, name in enumerate(["Admin", "admin_ops", "Auditor", "guest", "Ops", "ops%", "road",
+                                               "a.b", "axb", "Reader", "writer"])])
+    session.commit()
+    invalidate_counts(Role.__tablename__)
+    return session
+
+
+def sql_page(session, pagination: Pagination, *expressions) -> dict:
+    stmt = select(Role.id, Role.role_name, Role.role_status, Role.created_at).where(Role.is_deleted == False,
+                                                                                    *expressions)
+    # 游标分页由paginate追加ID排序;页码分页显式按ID兜底,与paginate_rows的排序一致
+    order = [Role.created_at.desc()] if pagination.cursor is not None else [Role.created_at.desc(), Role.id.desc()]
+    return paginate(session, stmt, pagination, order, Role.id)
+
+
+def memory_page(session, pagination: Pagination, name: str = "") -> dict:
+    rows = fetch_rows(session, select(Role.id, Role.role_name, Role.role_status, Role.created_at))
+    rows = [row for row in sort_rows(rows, [*ORDER, ("id", True)]) if not name or ilike(row["role_name"], name)]
+    return paginate_rows(rows, pagination, ORDER, columns=COLUMNS)
+
+
+@pytest.mark.parametrize("page_idx, page_size", product([-1, 0, 1, 2, 3, 12], [1, 2, 3, 5, 20]))
+def test_offset_matches_paginate(roles, page_idx, page_size):
+    pagination = Pagination(page_idx=page_idx, page_size=page_size)
+
+    assert memory_page(roles, pagination) == sql_page(roles, pagination)
+
+
+@pytest.mark.parametrize("page_size, with_total", product([1, 2, 4, 20], [False, True]))
+def test_cursor_walk_matches_paginate(roles, page_size, with_total):
+    cursor, ids = "", []
+    while cursor is not None:
+        pagination = Pagination(page_size=page_size, cursor=cursor, with_total=with_total)
+        expected = sql_page(roles, pagination)
+
+        assert memory_page(roles, pagination) == expected
+        cursor = expected["next_cursor"]
+        ids.extend(row["id"] for row in expected["records"])
+
+    assert sorted(ids) == list(range(1, 12))
+
+
+@pytest.mark.parametrize("name", ["%ad%", "A%", "%OPS%", "_dmin", "a.b", "%\\%%", "r%r", "nothing"])
+def test_filter_matches_paginate(roles, name):
+    for pagination in [Pagination(page_size=2), Pagination(page_size=2, cursor="", with_total=True)]:
+        assert memory_page(roles, pagination, name) == sql_page(roles, pagination, Role.role_name.ilike(name))
+
+
+def test_wrong_cursor_length_raises(roles):
+    pagination = Pagination(cursor=encode_cursor([1, 2, 3]))
+
+    with pytest.raises(InvalidCursor):
+        memory_page(roles, pagination)
+    with pytest.raises(InvalidCursor):
+        sql_page(roles, pagination)
+
+
+def test_estimate_total_only_without_where(roles, monkeypatch):
+    # 表统计信息包含逻辑删除的行,带WHERE条件时必须使用精确总数
+    monkeypatch.setattr(orm, "estimated_counts", lambda session, table: 100)
+    pagination = Pagination(page_size=5, estimate_total=True)
+
+    unfiltered = paginate(roles, select(Role.id), pagination, table=Role.__table__)
+    filtered = paginate(roles, select(Role.id).where(Role.is_deleted == False), pagination, table=Role.__table__)
+
+    assert unfiltered["pagination"]["total"] == 100
+    assert filtered["pagination"]["total"] == 11
+
+
+@pytest.mark.parametrize("value, pattern, matched", [
+    ("Admin", "%ad%", True),
+    ("road", "%AD%", True),
+    ("admin", "_dmin", True),
+    ("aadmin", "_dmin", False),
+    ("admin", "ADMIN", True),
+    ("admin", "adm", False),
+    ("a.b", "a.b", True),
+    ("axb", "a.b", False),
+    ("a(b", "a(b", True),
+    ("line\nbreak", "line%", True),
+    ("", "%", True),
+    ("", "_", False),
+])
+def test_like_pattern(value, pattern, matched):
+    assert ilike(value, pattern) is matched
+
+
+@pytest.mark.parametrize("value, pattern", product(["Admin", "ADMIN_OPS", "a.b", "axb", "x%y", "", "中文名称"],
+                                                   ["%", "_", "a%", "%B", "%min%", "a_b", "a.b", "__", "%名%", "ADMIN%"]))
+def test_like_pattern_matches_sqlite(session, value, pattern):
+    expected = session.scalar(select(literal(value).like(literal(pattern))))
+
+    assert ilike(value, pattern) is bool(expected)
+
+
+def test_like_pattern_is_cached():
+    assert like_pattern("%ab%") is like_pattern("%ab%")
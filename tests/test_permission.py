@@ -0,0 +1,74 @@
+from api.model.app import App, AppRole, AppService
+from api.model.org import Org, OrgUser, OrgUserRole, OrgUserStatus
+from api.model.role import Role, RoleStatus
+from api.schema.permission import PermissionIndex, invalidate_permission, permission_index
+
+
+def seed(session, role_status: int = RoleStatus.ENABLE.value) -> None:
+    app = App(app_name="one")
+    role = Role(role_name="acct", org_uuid="", role_status=role_status)
+    session.add_all([app, role, Org(org_uuid="o1", org_name="o1", owner_uuid="owner")])
+    session.flush()
+
+    service = AppService(app_id=app.id, service_name="账号列表", service_tag="acct:list")
+    session.add(service)
+    session.flush()
+
+    session.add_all([
+        AppRole(app_id=app.id, role_id=role.id, org_uuid="", app_service_id=service.id,
+                data_scope_dept=1, data_scope_region=2),
+        OrgUser(org_uuid="o1", user_uuid="u1", org_user_status=OrgUserStatus.ENABLE.value),
+        OrgUser(org_uuid="o1", user_uuid="u2", org_user_status=OrgUserStatus.DISABLE.value),
+        OrgUserRole(org_uuid="o1", user_uuid="u1", role_id=role.id),
+        OrgUserRole(org_uuid="o1", user_uuid="u2", role_id=role.id),
+    ])
+    session.commit()
+
+
+def test_load_grants_role_scopes(session):
+    seed(session)
+    index = PermissionIndex().load(session, "o1")
+
+    assert index["u1"].scopes == {"acct:list"}
+    assert index["u1"].data_scopes == {"acct:list": (1, 2)}
+    assert index["u1"].allows(["acct:list"])
+
+
+def test_load_skips_disabled_org_users(session):
+    seed(session)
+    permissions = PermissionIndex()
+    index = permissions.load(session, "o1")
+
+    assert "u2" not in index
+    assert not permissions.get("o1", "u2").allows(["acct:list"])
+
+
+def test_load_skips_disabled_roles(session):
+    seed(session, role_status=RoleStatus.DISABLE.value)
+
+    assert PermissionIndex().load(session, "o1") == {}
+
+
+def test_invalidate_during_load_is_not_cached(session, monkeypatch):
+    seed(session)
+    permissions = PermissionIndex()
+    execute = session.execute
+
+    def invalidating_execute(*args, **kwargs):
+        # 模拟查询期间其他请求变更了成员并失效索引
+        permissions.invalidate("o1")
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(session, "execute", invalidating_execute)
+    index = permissions.load(session, "o1")
+
+    assert "u1" in index
+    assert permissions.get("o1", "u1") is None
+
+
+def test_invalidate_permission_clears_index(session):
+    seed(session)
+    permission_index.load(session, "o1")
+    invalidate_permission("o1")
+
+    assert permission_index.get("o1", "u1") is None
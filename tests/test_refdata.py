@@ -0,0 +1,56 @@
+from sqlalchemy import update
+from api.model.app import App, AppService
+from api.model.role import Role
+from api.schema.refdata import RefDataCache
+
+
+def seed(session) -> None:
+    app = App(app_name="one")
+    session.add_all([app, Role(role_name="admin", org_uuid=""), Role(role_name="org", org_uuid="o1")])
+    session.flush()
+    session.add(AppService(app_id=app.id, service_name="账号列表", service_tag="acct:list"))
+    session.commit()
+
+
+def test_load_snapshot(session):
+    seed(session)
+    data = RefDataCache().load(session)
+
+    assert data.version == 1
+    assert [row["role_name"] for row in data.roles] == ["admin"]
+    assert [row["service_tag"] for row in data.services[data.apps[0]["id"]]] == ["acct:list"]
+
+
+def test_digest_is_stable_across_caches(session):
+    seed(session)
+
+    assert RefDataCache().load(session).digest == RefDataCache().load(session).digest
+
+
+def test_digest_changes_when_fingerprint_does_not(session):
+    """直接修改数据库且保留updated_at时表指纹不变,手动失效后重新加载的快照摘要仍会变化"""
+    seed(session)
+    cache = RefDataCache()
+    before = cache.load(session)
+
+    session.execute(update(Role).where(Role.role_name == "admin").values(role_name="root",
+                                                                         updated_at=Role.updated_at))
+    session.commit()
+    cache.invalidate()
+    after = cache.load(session)
+
+    assert after.fingerprint == before.fingerprint
+    assert after.digest != before.digest
+    assert after.version == before.version + 1
+    assert [row["role_name"] for row in after.roles] == ["root"]
+
+
+def test_unchanged_snapshot_keeps_version(session):
+    seed(session)
+    cache = RefDataCache(ttl=0)
+    before = cache.load(session)
+    after = cache.load(session)
+
+    assert after is before
+    assert cache.stats()["loads"] == 1
+    assert cache.stats()["checks"] == 2